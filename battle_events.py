@@ -0,0 +1,263 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Battle Events Module
+
+This module defines typed battle events and the buffered stream that
+hands them to sinks (console, JSON Lines file or nothing) in batches.
+"""
+
+import json
+import sys
+from collections import deque
+
+# Events held before the stream flushes to its sinks
+DEFAULT_BUFFER_SIZE = 256
+
+# ============================================================================
+# EVENT TYPES
+# ============================================================================
+
+class BattleEvent:
+    """Base class for battle events; every event records its turn."""
+
+    __slots__ = ("turn",)
+    kind = "event"
+
+    def __init__(self, turn):
+        self.turn = turn
+
+    def fields(self):
+        names = []
+        for cls in reversed(type(self).__mro__):
+            names.extend(getattr(cls, "__slots__", ()))
+        return names
+
+    def to_dict(self):
+        data = {"type": self.kind}
+        for name in self.fields():
+            data[name] = getattr(self, name)
+        return data
+
+    def render(self):
+        return self.kind
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+class BattleStartEvent(BattleEvent):
+    __slots__ = ("character", "enemy")
+    kind = "battle_start"
+
+    def __init__(self, turn, character, enemy):
+        super().__init__(turn)
+        self.character = character
+        self.enemy = enemy
+
+    def render(self):
+        return "Battle begins!"
+
+
+class TurnStartEvent(BattleEvent):
+    __slots__ = ("character", "character_health", "character_max_health",
+                 "enemy", "enemy_health", "enemy_max_health")
+    kind = "turn_start"
+
+    def __init__(self, turn, character, enemy):
+        super().__init__(turn)
+        self.character = character["name"]
+        self.character_health = character["health"]
+        self.character_max_health = character["max_health"]
+        self.enemy = enemy["name"]
+        self.enemy_health = enemy["health"]
+        self.enemy_max_health = enemy["max_health"]
+
+    def render(self):
+        return (f"{self.character}: HP={self.character_health}/{self.character_max_health} | "
+                f"{self.enemy}: HP={self.enemy_health}/{self.enemy_max_health}")
+
+
+class AttackEvent(BattleEvent):
+    __slots__ = ("attacker", "target", "damage", "target_health")
+    kind = "attack"
+
+    def __init__(self, turn, attacker, target, damage, target_health):
+        super().__init__(turn)
+        self.attacker = attacker
+        self.target = target
+        self.damage = damage
+        self.target_health = target_health
+
+    def render(self):
+        return f"{self.attacker} attacks {self.target} for {self.damage} damage!"
+
+
+class AbilityEvent(BattleEvent):
+    __slots__ = ("actor", "message", "damage", "healed")
+    kind = "ability"
+
+    def __init__(self, turn, actor, message, damage=0, healed=0):
+        super().__init__(turn)
+        self.actor = actor
+        self.message = message
+        self.damage = damage
+        self.healed = healed
+
+    def render(self):
+        return self.message
+
+
+class EscapeEvent(BattleEvent):
+    __slots__ = ("actor", "success")
+    kind = "escape"
+
+    def __init__(self, turn, actor, success):
+        super().__init__(turn)
+        self.actor = actor
+        self.success = success
+
+    def render(self):
+        return "You successfully escaped!" if self.success else "Failed to escape!"
+
+
+class SkippedTurnEvent(BattleEvent):
+    __slots__ = ("actor", "action", "reason")
+    kind = "skipped_turn"
+
+    def __init__(self, turn, actor, action, reason="invalid"):
+        super().__init__(turn)
+        self.actor = actor
+        self.action = action
+        self.reason = reason
+
+    def render(self):
+        if self.reason == "cooldown":
+            return "Your special ability is still on cooldown. You lose your turn."
+        return "Invalid choice. You lose your turn."
+
+
+class DeathEvent(BattleEvent):
+    __slots__ = ("name",)
+    kind = "death"
+
+    def __init__(self, turn, name):
+        super().__init__(turn)
+        self.name = name
+
+    def render(self):
+        return f"{self.name} has been defeated!"
+
+
+class RewardEvent(BattleEvent):
+    __slots__ = ("xp", "gold")
+    kind = "reward"
+
+    def __init__(self, turn, xp, gold):
+        super().__init__(turn)
+        self.xp = xp
+        self.gold = gold
+
+    def render(self):
+        return f"You won the battle! Gained {self.xp} XP and {self.gold} gold."
+
+# ============================================================================
+# SINKS
+# ============================================================================
+
+class NullSink:
+    """Discards every batch."""
+
+    def write(self, events):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink:
+    """Renders each batch as text with a single write."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, events):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("".join(f">>> {event.render()}\n" for event in events))
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends one JSON object per event to a file (path or open file)."""
+
+    def __init__(self, target):
+        if isinstance(target, str):
+            self.file = open(target, "a", encoding="utf-8")
+            self.owns_file = True
+        else:
+            self.file = target
+            self.owns_file = False
+
+    def write(self, events):
+        self.file.write("".join(json.dumps(event.to_dict()) + "\n" for event in events))
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class CollectingSink:
+    """Keeps every event in a list (for tests and tools)."""
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, events):
+        self.events.extend(events)
+
+    def close(self):
+        pass
+
+# ============================================================================
+# EVENT STREAM
+# ============================================================================
+
+class EventStream:
+    """
+    Bounded buffer of battle events flushed to sinks in batches
+
+    The buffer is flushed whenever it fills up, when flush() is called
+    and on close(), so no event is dropped. Battles without a stream
+    (events=None) skip building events altogether.
+    """
+
+    def __init__(self, sinks=(), capacity=DEFAULT_BUFFER_SIZE):
+        if capacity < 1:
+            raise ValueError("Event buffer capacity must be at least 1")
+        self.sinks = list(sinks)
+        self.capacity = capacity
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch = list(self.buffer)
+        self.buffer.clear()
+        for sink in self.sinks:
+            sink.write(batch)
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
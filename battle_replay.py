@@ -0,0 +1,256 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Battle Replay Module
+
+This module records battles as compact binary replays (seed, starting
+stats and one 2-bit opcode per player action) and re-runs them exactly
+through SimpleBattle.
+"""
+
+import random
+import struct
+
+import combat_system
+from custom_exceptions import CorruptedDataError
+
+REPLAY_MAGIC = b"QCR1"
+# Version 2: ability cooldowns and final health in the outcome (version 1
+# replays no longer re-run the same)
+REPLAY_VERSION = 2
+
+# magic, version, seed
+HEADER = struct.Struct("<4sBQ")
+# health, max_health, strength, magic
+CHARACTER_STATS = struct.Struct("<4i")
+# health, max_health, strength, magic, xp_reward, gold_reward
+ENEMY_STATS = struct.Struct("<6i")
+# winner code, turns, final character health, final enemy health,
+# number of recorded actions
+OUTCOME = struct.Struct("<BIiiI")
+# length prefix of each replay in an archive file
+RECORD_LENGTH = struct.Struct("<I")
+
+# Player action opcodes (2 bits each, four to a byte); 3 is a lost turn
+ACTION_CODES = {
+    combat_system.ACTION_ATTACK: 0,
+    combat_system.ACTION_ABILITY: 1,
+    combat_system.ACTION_RUN: 2
+}
+CODE_ACTIONS = [combat_system.ACTION_ATTACK, combat_system.ACTION_ABILITY, combat_system.ACTION_RUN, None]
+SKIPPED_CODE = 3
+
+WINNERS = ["player", "enemy", "escaped", "draw"]
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+class RecordingPolicy:
+    """Wrap another policy and remember every action it chooses."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.actions = []
+        # Interactive policies keep their console battle log
+        self.interactive = getattr(policy, "interactive", False)
+
+    def choose_action(self, battle):
+        action = self.policy.choose_action(battle)
+        self.actions.append(action)
+        return action
+
+
+def record_battle(character, enemy, policy=None, seed=None, events=None):
+    """
+    Fight a battle and record it
+
+    policy defaults to the interactive ConsolePolicy, which shows the
+    battle log on the console when events is None. The battle's rolls
+    come from random.Random(seed); a seed is picked if none is given.
+    Returns (result, replay_bytes).
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    if policy is None:
+        policy = combat_system.ConsolePolicy()
+
+    start_character = dict(character)
+    start_enemy = dict(enemy)
+    recorder = RecordingPolicy(policy)
+    battle = combat_system.SimpleBattle(character, enemy, recorder, events, random.Random(seed))
+    result = battle.start_battle()
+
+    replay = encode_replay(seed, start_character, start_enemy, recorder.actions, result)
+    return result, replay
+
+# ============================================================================
+# BINARY FORMAT
+# ============================================================================
+
+def _pack_text(text):
+    data = text.encode("utf-8")
+    if len(data) > 255:
+        raise ValueError("Replay text fields are limited to 255 bytes")
+    return bytes([len(data)]) + data
+
+
+def _unpack_text(data, offset):
+    length = data[offset]
+    end = offset + 1 + length
+    if end > len(data):
+        raise CorruptedDataError("Replay ends inside a text field.")
+    return data[offset + 1:end].decode("utf-8"), end
+
+
+def pack_actions(actions):
+    """Pack actions into bytes, four 2-bit opcodes per byte."""
+    packed = bytearray((len(actions) + 3) // 4)
+    for index, action in enumerate(actions):
+        code = ACTION_CODES.get(action, SKIPPED_CODE)
+        packed[index >> 2] |= code << ((index & 3) * 2)
+    return bytes(packed)
+
+
+def unpack_actions(packed, count):
+    """Inverse of pack_actions."""
+    return [CODE_ACTIONS[(packed[index >> 2] >> ((index & 3) * 2)) & 3] for index in range(count)]
+
+
+def encode_replay(seed, character, enemy, actions, result):
+    """Serialize one battle into the replay format."""
+    return b"".join([
+        HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed),
+        _pack_text(character["name"]),
+        _pack_text(character["class"]),
+        CHARACTER_STATS.pack(character["health"], character["max_health"],
+                             character["strength"], character["magic"]),
+        _pack_text(enemy["name"]),
+        ENEMY_STATS.pack(enemy["health"], enemy["max_health"], enemy["strength"],
+                         enemy["magic"], enemy["xp_reward"], enemy["gold_reward"]),
+        OUTCOME.pack(WINNERS.index(result["winner"]), result["turns"],
+                     result["character_health"], result["enemy_health"], len(actions)),
+        pack_actions(actions)
+    ])
+
+
+def decode_replay(data):
+    """
+    Parse replay bytes into a dictionary
+
+    Keys: seed, character, enemy (starting dictionaries), actions,
+    winner, turns, character_health and enemy_health. Raises CorruptedDataError for bad data.
+    """
+    try:
+        magic, version, seed = HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC:
+            raise CorruptedDataError("Not a battle replay.")
+        if version != REPLAY_VERSION:
+            raise CorruptedDataError(
+                f"Replay version {version} was recorded under different combat rules "
+                f"(expected version {REPLAY_VERSION})."
+            )
+        offset = HEADER.size
+
+        name, offset = _unpack_text(data, offset)
+        char_class, offset = _unpack_text(data, offset)
+        health, max_health, strength, magic_stat = CHARACTER_STATS.unpack_from(data, offset)
+        offset += CHARACTER_STATS.size
+        character = {
+            "name": name, "class": char_class, "health": health,
+            "max_health": max_health, "strength": strength, "magic": magic_stat
+        }
+
+        enemy_name, offset = _unpack_text(data, offset)
+        stats = ENEMY_STATS.unpack_from(data, offset)
+        offset += ENEMY_STATS.size
+        enemy = {"name": enemy_name}
+        enemy.update(zip(["health", "max_health", "strength", "magic", "xp_reward", "gold_reward"], stats))
+
+        winner_code, turns, final_health, final_enemy_health, action_count = \
+            OUTCOME.unpack_from(data, offset)
+        offset += OUTCOME.size
+        packed = data[offset:]
+        if len(packed) != (action_count + 3) // 4:
+            raise CorruptedDataError("Replay action stream has the wrong length.")
+        winner = WINNERS[winner_code]
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise CorruptedDataError("Corrupted battle replay.")
+
+    return {
+        "seed": seed,
+        "character": character,
+        "enemy": enemy,
+        "actions": unpack_actions(packed, action_count),
+        "winner": winner,
+        "turns": turns,
+        "character_health": final_health,
+        "enemy_health": final_enemy_health
+    }
+
+# ============================================================================
+# REPLAYING
+# ============================================================================
+
+def replay_battle(data, events=None):
+    """
+    Re-run a recorded battle through SimpleBattle
+
+    Uses the recorded seed, starting stats and actions, so the result is
+    the same as the original fight. Returns the new result record.
+    """
+    replay = decode_replay(data)
+    policy = combat_system.ScriptedPolicy(replay["actions"])
+    battle = combat_system.SimpleBattle(
+        replay["character"], replay["enemy"], policy, events, random.Random(replay["seed"])
+    )
+    return battle.start_battle()
+
+
+def replay_version(data):
+    """Format version stored in replay bytes."""
+    try:
+        magic, version, _ = HEADER.unpack_from(data, 0)
+    except struct.error:
+        raise CorruptedDataError("Corrupted battle replay.")
+    if magic != REPLAY_MAGIC:
+        raise CorruptedDataError("Not a battle replay.")
+    return version
+
+
+def verify_replay(data):
+    """
+    True if re-running the replay reaches the recorded outcome
+
+    Replays from another format version return False (their battles
+    followed different rules); corrupted data raises CorruptedDataError.
+    """
+    if replay_version(data) != REPLAY_VERSION:
+        return False
+    replay = decode_replay(data)
+    result = replay_battle(data)
+    return all(result[key] == replay[key]
+               for key in ("winner", "turns", "character_health", "enemy_health"))
+
+
+def write_replays(filename, replays):
+    """Append replays to an archive file (each one length-prefixed)."""
+    with open(filename, "ab") as f:
+        for replay in replays:
+            f.write(RECORD_LENGTH.pack(len(replay)))
+            f.write(replay)
+
+
+def read_replays(filename):
+    """Yield every replay stored in an archive file."""
+    with open(filename, "rb") as f:
+        while True:
+            prefix = f.read(RECORD_LENGTH.size)
+            if not prefix:
+                return
+            if len(prefix) < RECORD_LENGTH.size:
+                raise CorruptedDataError("Replay archive ends inside a length prefix.")
+            (length,) = RECORD_LENGTH.unpack(prefix)
+            replay = f.read(length)
+            if len(replay) < length:
+                raise CorruptedDataError("Replay archive ends inside a replay.")
+            yield replay
@@ -0,0 +1,215 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Battle Simulator Module
+
+This module runs large numbers of headless SimpleBattle fights for
+balance testing and summarizes the results.
+"""
+
+import math
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import character_manager
+import combat_kernel
+import combat_system
+
+CHARACTER_CLASSES = ["Warrior", "Mage", "Rogue", "Cleric"]
+
+# Policies are passed to worker processes by name
+POLICIES = {
+    "attack": combat_system.AlwaysAttackPolicy,
+    "ability": combat_system.AbilityWhenReadyPolicy,
+    "flee": combat_system.FleeBelowPolicy
+}
+
+# Battles per unit of work; each chunk gets its own seeded RNG, so results
+# depend only on (seed, battles, chunk_size), never on the number of workers
+CHUNK_SIZE = 50000
+
+HP_PERCENTILES = [5, 25, 50, 75, 95]
+
+# "battle" fights through SimpleBattle, "kernel" through combat_kernel
+ENGINES = ["battle", "kernel"]
+
+# ============================================================================
+# CHARACTER SETUP
+# ============================================================================
+
+def create_character_at_level(character_class, level):
+    """Create a full-health character with the base stats of the given level."""
+    character = character_manager.create_character(f"Sim {character_class}", character_class)
+    levels_gained = level - 1
+    character["level"] = level
+    character["base_max_health"] += 10 * levels_gained
+    character["base_strength"] += 2 * levels_gained
+    character["base_magic"] += 2 * levels_gained
+    character_manager.refresh_derived_stats(character)
+    character["health"] = character["max_health"]
+    return character
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def _chunk_rng(seed, matchup, chunk):
+    """Independent, reproducible RNG stream for one chunk of one matchup."""
+    return random.Random(f"{seed}:{matchup}:{chunk}")
+
+
+def _run_chunk(character_class, level, enemy_type, policy_name, count, seed, chunk, engine="battle"):
+    """
+    Fight count battles and return raw tallies
+
+    Returns (outcomes, turns, hp_left) Counters keyed by winner,
+    turn count and remaining character health.
+    """
+    template = create_character_at_level(character_class, level)
+    enemy_template = combat_system.create_enemy(enemy_type)
+    rng = _chunk_rng(seed, f"{character_class}/{level}/{enemy_type}/{policy_name}", chunk)
+
+    if engine == "kernel":
+        results = combat_kernel.run_matchup_batch(template, enemy_template, count, policy_name, rng)
+        return Counter(results["winner"]), Counter(results["turns"]), Counter(results["character_health"])
+
+    policy = POLICIES[policy_name]()
+    outcomes = Counter()
+    turns = Counter()
+    hp_left = Counter()
+    for _ in range(count):
+        battle = combat_system.SimpleBattle(dict(template), enemy_template.copy(), policy, None, rng)
+        result = battle.start_battle()
+        outcomes[result["winner"]] += 1
+        turns[result["turns"]] += 1
+        hp_left[result["character_health"]] += 1
+    return outcomes, turns, hp_left
+
+
+def _chunk_sizes(battles, chunk_size):
+    full, rest = divmod(battles, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def simulate_matchup(character_class, level, enemy_type, battles, policy="ability",
+                     seed=0, workers=None, chunk_size=CHUNK_SIZE, executor=None, engine="battle"):
+    """
+    Simulate battles fights of one class/level against one enemy type
+
+    Work is split into chunks and spread over a ProcessPoolExecutor
+    (workers=1 runs everything in this process). engine="kernel" fights
+    each chunk as one lockstep batch. Returns the summary described in
+    summarize_results.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    sizes = _chunk_sizes(battles, chunk_size)
+    jobs = [
+        (character_class, level, enemy_type, policy, count, seed, chunk, engine)
+        for chunk, count in enumerate(sizes)
+    ]
+
+    if executor is not None:
+        parts = list(executor.map(_run_chunk, *zip(*jobs))) if jobs else []
+    elif workers == 1 or len(jobs) <= 1:
+        parts = [_run_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_chunk, *zip(*jobs)))
+
+    outcomes, turns, hp_left = Counter(), Counter(), Counter()
+    for part_outcomes, part_turns, part_hp in parts:
+        outcomes.update(part_outcomes)
+        turns.update(part_turns)
+        hp_left.update(part_hp)
+    return summarize_results(outcomes, turns, hp_left)
+
+
+def simulate_all_matchups(level, battles, policy="ability", seed=0, workers=None,
+                          chunk_size=CHUNK_SIZE, engine="battle"):
+    """
+    Simulate every class against every registered enemy type at one level
+
+    Returns {(character_class, enemy_type): summary}.
+    """
+    enemy_types = combat_system.get_enemy_types()
+    results = {}
+    if workers == 1:
+        for character_class in CHARACTER_CLASSES:
+            for enemy_type in enemy_types:
+                results[(character_class, enemy_type)] = simulate_matchup(
+                    character_class, level, enemy_type, battles, policy, seed, 1, chunk_size,
+                    engine=engine
+                )
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for character_class in CHARACTER_CLASSES:
+            for enemy_type in enemy_types:
+                results[(character_class, enemy_type)] = simulate_matchup(
+                    character_class, level, enemy_type, battles, policy, seed,
+                    chunk_size=chunk_size, executor=pool, engine=engine
+                )
+    return results
+
+# ============================================================================
+# STATISTICS
+# ============================================================================
+
+def wilson_interval(successes, trials, z=1.96):
+    """Wilson score confidence interval for a proportion (95% by default)."""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def counter_percentiles(counts, percentiles):
+    """Nearest-rank percentiles of the values tallied in a Counter."""
+    total = sum(counts.values())
+    if total == 0:
+        return {p: None for p in percentiles}
+
+    values = sorted(counts)
+    results = {}
+    for p in percentiles:
+        rank = max(1, math.ceil(p / 100 * total))
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            if seen >= rank:
+                results[p] = value
+                break
+    return results
+
+
+def summarize_results(outcomes, turns, hp_left):
+    """
+    Summarize raw tallies
+
+    Returns a dictionary with battles, outcomes, win_rate, win_rate_ci
+    (95% Wilson interval), turn statistics and hp_percentiles.
+    """
+    battles = sum(outcomes.values())
+    wins = outcomes.get("player", 0)
+    total_turns = sum(count * value for value, count in turns.items())
+
+    return {
+        "battles": battles,
+        "outcomes": dict(outcomes),
+        "win_rate": wins / battles if battles else 0.0,
+        "win_rate_ci": wilson_interval(wins, battles),
+        "turns": {
+            "min": min(turns) if turns else 0,
+            "max": max(turns) if turns else 0,
+            "mean": total_turns / battles if battles else 0.0,
+            "distribution": dict(sorted(turns.items()))
+        },
+        "hp_percentiles": counter_percentiles(hp_left, HP_PERCENTILES)
+    }
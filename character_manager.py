@@ -11,6 +11,8 @@ This module handles character creation, loading, and saving.
 
            
 import os
+import game_data
+import quest_handler
 from custom_exceptions import (
     InvalidCharacterClassError,
     CharacterNotFoundError,
@@ -19,6 +21,12 @@ from custom_exceptions import (
     CharacterDeadError
 )
 
+# Stats whose effective value is base stat + equipment/buff modifiers
+DERIVED_STATS = ["max_health", "strength", "magic"]
+
+# Equipment slots, which are also their modifier sources
+EQUIPMENT_SLOTS = ["equipped_weapon", "equipped_armor"]
+
 
 # ============================================================================
 # CHARACTER MANAGEMENT FUNCTIONS
@@ -51,11 +59,14 @@ def create_character(name, character_class):
         "max_health": stats["health"],
         "strength": stats["strength"],
         "magic": stats["magic"],
+        "base_max_health": stats["health"],
+        "base_strength": stats["strength"],
+        "base_magic": stats["magic"],
         "experience": 0,
         "gold": 100,
         "inventory": [],
-        "active_quests": [],
-        "completed_quests": []
+        "active_quests": quest_handler.QuestSet(),
+        "completed_quests": quest_handler.QuestSet()
     }
 
 
@@ -70,10 +81,13 @@ def save_character(character, save_directory="data/save_games"):
     filepath = os.path.join(save_directory, f"{character['name']}_save.txt")
 
     # 3. Write each key/value to the file, converting lists to comma-separated strings
+    #    (keys starting with "_" are runtime caches and are not saved)
     try:
         with open(filepath, "w") as f:
             for key, value in character.items():
-                if isinstance(value, list):
+                if key.startswith("_"):
+                    continue
+                if isinstance(value, (list, quest_handler.QuestSet)):
                     value = ",".join(value)
                 f.write(f"{key}:{value}\n")
         return True
@@ -112,6 +126,14 @@ def load_character(character_name, save_directory="data/save_games"):
     except Exception as e:
         raise InvalidSaveDataError(f"Save data format is invalid for {character_name}: {e}")
 
+    # 4. Quest lists become ordered sets (zero or one ID is saved without a comma)
+    for key in ("active_quests", "completed_quests"):
+        if key in character:
+            value = character[key]
+            if not isinstance(value, list):
+                value = [str(value)] if str(value) else []
+            character[key] = quest_handler.QuestSet(value)
+
     return character
 
 
@@ -162,16 +184,23 @@ def gain_experience(character, xp_amount):
     # 2. Add experience points
     character["experience"] += xp_amount
 
-    # 3. Level up while experience reaches required XP
+    # 3. Level up while experience reaches required XP (gains go to base stats)
+    old_level = character["level"]
     while character["experience"] >= character["level"] * 100:
         level_up_xp = character["level"] * 100
         character["experience"] -= level_up_xp
         character["level"] += 1
-        character["max_health"] += 10
-        character["strength"] += 2
-        character["magic"] += 2
+        _ensure_base_stats(character)
+        character["base_max_health"] += 10
+        character["base_strength"] += 2
+        character["base_magic"] += 2
+        refresh_derived_stats(character)
         character["health"] = character["max_health"]
 
+    # 4. Newly reached level bands may unlock quests
+    if character["level"] != old_level:
+        quest_handler.update_available_quests_for_level(character, old_level)
+
 
 def add_gold(character, amount):
     """
@@ -229,6 +258,115 @@ def revive_character(character):
     return True
 
 
+# ============================================================================
+# DERIVED STATS
+# ============================================================================
+
+# character["strength"], ["max_health"] and ["magic"] hold the cached
+# effective values, so combat code reads them as plain dict lookups. They are
+# recomputed from base_* stats and the modifier table only when equipment,
+# buffs or base stats change.
+
+def get_stat_modifiers(character):
+    """
+    Return the character's modifier table {source: (stat, value)}
+
+    Sources are equipment slots ("equipped_weapon") or buff names.
+    Equipment modifiers are looked up by item ID in the shared item
+    registry, and looked up again whenever a new catalog is registered
+    (an item missing from the new catalog stops counting).
+    """
+    version = game_data.get_item_registry_version()
+    if character.get("_stat_modifiers_version") != version:
+        _ensure_base_stats(character)
+        modifiers = character.setdefault("_stat_modifiers", {})
+        equipment = _equipment_modifiers(character)
+        for slot in EQUIPMENT_SLOTS:
+            if slot in equipment:
+                modifiers[slot] = equipment[slot]
+            else:
+                modifiers.pop(slot, None)
+        character["_stat_modifiers_version"] = version
+    return character["_stat_modifiers"]
+
+
+def set_stat_modifier(character, source, stat_name, value):
+    """
+    Add or replace a stat modifier and refresh effective stats
+    """
+    get_stat_modifiers(character)[source] = (stat_name, value)
+    refresh_derived_stats(character)
+
+
+def remove_stat_modifier(character, source):
+    """
+    Remove a stat modifier (if present) and refresh effective stats
+    """
+    get_stat_modifiers(character).pop(source, None)
+    refresh_derived_stats(character)
+
+
+def add_base_stat(character, stat_name, amount):
+    """
+    Permanently change a base stat and refresh effective stats
+    """
+    _ensure_base_stats(character)
+    character["base_" + stat_name] += amount
+    refresh_derived_stats(character)
+
+
+def refresh_derived_stats(character):
+    """
+    Recompute cached effective stats from base stats plus modifiers
+    """
+    modifiers = get_stat_modifiers(character)
+
+    # 1. Start from base stats
+    for stat in DERIVED_STATS:
+        if "base_" + stat in character:
+            character[stat] = character["base_" + stat]
+
+    # 2. Add every equipment/buff modifier
+    for stat, value in modifiers.values():
+        if stat in DERIVED_STATS and "base_" + stat in character:
+            character[stat] += value
+
+    # 3. Health cannot exceed the new max_health
+    if "health" in character and "max_health" in character:
+        character["health"] = min(character["health"], character["max_health"])
+
+
+def _equipment_modifiers(character):
+    """{slot: (stat, value)} for equipped items found in the item registry"""
+    registry = game_data.get_item_registry()
+    modifiers = {}
+    for slot in EQUIPMENT_SLOTS:
+        item = registry.get(character.get(slot))
+        if item is not None:
+            stat, value = item["effect"].split(":")
+            modifiers[slot] = (stat, int(value))
+    return modifiers
+
+
+def _ensure_base_stats(character):
+    """
+    Add base stats to characters created without them
+
+    Older saves hold effective stats with equipment effects already
+    added, so those effects are taken off to get the base stats.
+    """
+    missing = [stat for stat in DERIVED_STATS
+               if "base_" + stat not in character and stat in character]
+    if not missing:
+        return
+
+    bonuses = {}
+    for stat, value in _equipment_modifiers(character).values():
+        bonuses[stat] = bonuses.get(stat, 0) + value
+    for stat in missing:
+        character["base_" + stat] = character[stat] - bonuses.get(stat, 0)
+
+
 # ============================================================================
 # VALIDATION
 # ============================================================================
@@ -249,7 +387,7 @@ def validate_character_data(character):
         "experience": int,
         "gold": int,
         "inventory": list,
-        "active_quests": list,
-        "completed_quests": list
+        "active_quests": (list, quest_handler.QuestSet),
+        "completed_quests": (list, quest_handler.QuestSet)
     }
 
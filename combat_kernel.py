@@ -0,0 +1,182 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Combat Kernel Module
+
+This module simulates many independent one-on-one battles in lockstep.
+Fight state is kept column-wise (one list per stat, index i is fight i),
+and each round only walks the fights that are still running. The rules
+are the same as combat_system.SimpleBattle with the built-in policies,
+and ability numbers come from combat_system.CLASS_ABILITIES.
+
+This is plain Python (no NumPy), so every fight-round still costs a few
+interpreted steps: expect roughly 4-6x the speed of looping SimpleBattle.
+For fights without random rolls, combat_solver answers in O(1) instead.
+"""
+
+import random
+from array import array
+import combat_system
+from custom_exceptions import CharacterDeadError
+
+# Ability kinds, derived from combat_system.CLASS_ABILITIES (classes
+# without an ability deal 0 damage): sure damage, damage that lands with
+# probability ability_chance, and healing
+ABILITY_DAMAGE = 1
+ABILITY_CRIT = 2
+ABILITY_HEAL = 3
+
+KERNEL_POLICIES = ["attack", "ability", "flee"]
+
+# ============================================================================
+# FIGHT COLUMNS
+# ============================================================================
+
+def _ability_columns(character):
+    """(ability kind, ability amount, chance) from the character's CLASS_ABILITIES entry."""
+    ability = combat_system.get_ability(character)
+    if ability is None:
+        return ABILITY_DAMAGE, 0, 1.0
+    if ability["effect"] == "heal":
+        kind = ABILITY_HEAL
+    elif ability["chance"] < 1:
+        kind = ABILITY_CRIT
+    else:
+        kind = ABILITY_DAMAGE
+    return kind, combat_system.get_ability_amount(character), ability["chance"]
+
+
+def build_fight_columns(characters, enemies):
+    """
+    Turn parallel lists of characters and enemies into fight columns
+
+    Damage only depends on strength, which does not change during a
+    battle, so both sides' per-hit damage is computed once here.
+    """
+    if len(characters) != len(enemies):
+        raise ValueError("Need exactly one enemy per character")
+
+    columns = {
+        "player_hp": [], "player_max_hp": [], "player_damage": [],
+        "ability_kind": [], "ability_amount": [], "ability_chance": [], "ability_cooldown": [],
+        "enemy_hp": [], "enemy_damage": []
+    }
+    for character, enemy in zip(characters, enemies):
+        kind, amount, chance = _ability_columns(character)
+        columns["ability_cooldown"].append(combat_system.get_ability_cooldown(character))
+        columns["player_hp"].append(character["health"])
+        columns["player_max_hp"].append(character["max_health"])
+        columns["player_damage"].append(max(1, character["strength"] - enemy["strength"] // 4))
+        columns["ability_kind"].append(kind)
+        columns["ability_amount"].append(amount)
+        columns["ability_chance"].append(chance)
+        columns["enemy_hp"].append(enemy["health"])
+        columns["enemy_damage"].append(max(1, enemy["strength"] - character["strength"] // 4))
+    return columns
+
+# ============================================================================
+# LOCKSTEP SIMULATION
+# ============================================================================
+
+def run_battle_batch(characters, enemies, policy="ability", rng=random,
+                     heal_below=0.5, flee_below=0.25, max_turns=combat_system.MAX_BATTLE_TURNS):
+    """
+    Fight characters[i] against enemies[i] for every i, all in lockstep
+
+    policy is "attack", "ability" or "flee", matching AlwaysAttackPolicy,
+    AbilityWhenReadyPolicy(heal_below) and FleeBelowPolicy(flee_below).
+    Ability cooldowns follow combat_system.CLASS_ABILITIES.
+    The input dictionaries are not modified. Returns column lists:
+    winner, turns, character_health and enemy_health.
+    """
+    if policy not in KERNEL_POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+
+    columns = build_fight_columns(characters, enemies)
+    player_hp = columns["player_hp"]
+    player_max = columns["player_max_hp"]
+    player_damage = columns["player_damage"]
+    ability_kind = columns["ability_kind"]
+    ability_amount = columns["ability_amount"]
+    ability_chance = columns["ability_chance"]
+    ability_cooldown = columns["ability_cooldown"]
+    enemy_hp = columns["enemy_hp"]
+    enemy_damage = columns["enemy_damage"]
+
+    count = len(player_hp)
+    ready_at = array("i", [0]) * count
+    winner = [None] * count
+    turns = [0] * count
+    use_ability = policy == "ability"
+    flee = policy == "flee"
+    escape_chance = combat_system.ESCAPE_CHANCE
+    draw = rng.random
+
+    if any(hp <= 0 for hp in player_hp):
+        raise CharacterDeadError("Character cannot start battle while dead.")
+
+    active = list(range(count))
+    turn = 0
+    while active and turn < max_turns:
+        turn += 1
+        still_active = []
+        keep = still_active.append
+
+        for i in active:
+            # Player turn
+            hp = player_hp[i]
+            if flee and hp < player_max[i] * flee_below:
+                if draw() < escape_chance:
+                    winner[i] = "escaped"
+                    turns[i] = turn
+                    continue
+            elif use_ability and turn >= ready_at[i]:
+                kind = ability_kind[i]
+                if kind == ABILITY_DAMAGE:
+                    enemy_hp[i] -= ability_amount[i]
+                    ready_at[i] = turn + ability_cooldown[i]
+                elif kind == ABILITY_CRIT:
+                    if draw() < ability_chance[i]:
+                        enemy_hp[i] -= ability_amount[i]
+                    ready_at[i] = turn + ability_cooldown[i]
+                elif hp < player_max[i] * heal_below:
+                    hp = min(player_max[i], hp + ability_amount[i])
+                    ready_at[i] = turn + ability_cooldown[i]
+                else:
+                    enemy_hp[i] -= player_damage[i]
+            else:
+                enemy_hp[i] -= player_damage[i]
+
+            if enemy_hp[i] <= 0:
+                enemy_hp[i] = 0
+                player_hp[i] = hp
+                winner[i] = "player"
+                turns[i] = turn
+                continue
+
+            # Enemy turn
+            hp -= enemy_damage[i]
+            if hp <= 0:
+                player_hp[i] = 0
+                winner[i] = "enemy"
+                turns[i] = turn
+                continue
+
+            player_hp[i] = hp
+            keep(i)
+        active = still_active
+
+    for i in active:
+        winner[i] = "draw"
+        turns[i] = turn
+
+    return {
+        "winner": winner,
+        "turns": turns,
+        "character_health": player_hp,
+        "enemy_health": enemy_hp
+    }
+
+
+def run_matchup_batch(character, enemy, count, policy="ability", rng=random, **options):
+    """Fight the same character/enemy matchup count times in one batch."""
+    return run_battle_batch([character] * count, [enemy] * count, policy, rng, **options)
@@ -0,0 +1,230 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Combat Solver Module
+
+This module computes battle outcomes exactly instead of sampling them.
+Fights whose damage per round follows a fixed pattern are solved
+arithmetically; fights with random rolls (rogue crits, escape attempts)
+or HP-dependent choices (cleric heals) are solved by propagating the
+probability of every (character HP, enemy HP, ability cooldown) state
+one round at a time.
+"""
+
+from fractions import Fraction
+import combat_kernel
+import combat_system
+
+# ============================================================================
+# CLOSED FORM
+# ============================================================================
+
+# A damage pattern (first, other, period) means: first damage on rounds
+# 1, 1 + period, 1 + 2 * period, ... and other damage on every other round.
+# Basic attacks are (d, d, 1); an ability with a cooldown is (ability,
+# attack, cooldown) under the "ability" policy.
+
+def _damage_after(rounds, pattern):
+    """Total damage dealt over the first rounds rounds."""
+    first, other, period = pattern
+    cycles, extra = divmod(rounds, period)
+    total = cycles * (first + (period - 1) * other)
+    if extra:
+        total += first + (extra - 1) * other
+    return total
+
+
+def _rounds_to_kill(health, pattern):
+    """Rounds needed to deal health damage (None if the pattern deals none)."""
+    first, other, period = pattern
+    cycle_damage = first + (period - 1) * other
+    if cycle_damage <= 0:
+        return None
+
+    cycles = (health - 1) // cycle_damage
+    remaining = health - cycles * cycle_damage
+    if first >= remaining:
+        extra = 1
+    else:
+        extra = 1 + -(-(remaining - first) // other)
+    return cycles * period + extra
+
+
+def _player_damage_pattern(columns, policy):
+    """Player damage pattern if it never depends on luck or HP, otherwise None."""
+    attack = columns["player_damage"][0]
+    if policy == "attack":
+        return attack, attack, 1
+    if policy == "ability" and columns["ability_kind"][0] == combat_kernel.ABILITY_DAMAGE:
+        return columns["ability_amount"][0], attack, columns["ability_cooldown"][0]
+    return None
+
+
+def is_deterministic(character, enemy, policy="attack"):
+    """True if the matchup can be solved in closed form."""
+    columns = combat_kernel.build_fight_columns([character], [enemy])
+    return _player_damage_pattern(columns, policy) is not None
+
+
+def solve_deterministic(character, enemy, policy="attack", max_turns=combat_system.MAX_BATTLE_TURNS):
+    """
+    Solve a fixed-damage matchup in O(1)
+
+    The player strikes first each round, so they win if they need no
+    more rounds than the enemy does. Returns the same winner, turns,
+    character_health and enemy_health fields as SimpleBattle.start_battle.
+    """
+    columns = combat_kernel.build_fight_columns([character], [enemy])
+    player_pattern = _player_damage_pattern(columns, policy)
+    if player_pattern is None:
+        raise ValueError(f"Matchup is not deterministic under policy: {policy}")
+    enemy_damage = columns["enemy_damage"][0]
+    enemy_pattern = (enemy_damage, enemy_damage, 1)
+    player_hp = character["health"]
+    enemy_hp = enemy["health"]
+
+    player_rounds = _rounds_to_kill(enemy_hp, player_pattern)
+    enemy_rounds = _rounds_to_kill(player_hp, enemy_pattern)
+
+    if player_rounds is not None and player_rounds <= enemy_rounds and player_rounds <= max_turns:
+        return {
+            "winner": "player",
+            "turns": player_rounds,
+            "character_health": player_hp - (player_rounds - 1) * enemy_damage,
+            "enemy_health": 0
+        }
+    if enemy_rounds <= max_turns:
+        return {
+            "winner": "enemy",
+            "turns": enemy_rounds,
+            "character_health": 0,
+            "enemy_health": enemy_hp - _damage_after(enemy_rounds, player_pattern)
+        }
+    return {
+        "winner": "draw",
+        "turns": max_turns,
+        "character_health": player_hp - max_turns * enemy_damage,
+        "enemy_health": enemy_hp - _damage_after(max_turns, player_pattern)
+    }
+
+# ============================================================================
+# EXACT DISTRIBUTIONS
+# ============================================================================
+
+def _probability(value, exact):
+    """value as a Fraction (exact) or a float."""
+    return Fraction(value).limit_denominator() if exact else float(value)
+
+
+def _round_transitions(columns, policy, player_hp, enemy_hp, wait, escape, crit, heal_below, flee_below):
+    """
+    Outcomes of one round from (player_hp, enemy_hp, wait)
+
+    wait is the number of rounds until the ability is ready again;
+    escape and crit are the escape and ability-landing probabilities.
+    Yields (probability, player_hp, enemy_hp, wait, winner) with winner
+    None if the battle continues.
+    """
+    max_hp = columns["player_max_hp"][0]
+    kind = columns["ability_kind"][0]
+    amount = columns["ability_amount"][0]
+    ability_ready = policy == "ability" and wait == 0
+    used = columns["ability_cooldown"][0] - 1
+    waited = max(0, wait - 1)
+
+    # Player turn: list of (probability, player_hp, enemy_hp, wait)
+    if policy == "flee" and player_hp < max_hp * flee_below:
+        yield escape, player_hp, enemy_hp, wait, "escaped"
+        after_player = [(1 - escape, player_hp, enemy_hp, waited)]
+    elif ability_ready and kind == combat_kernel.ABILITY_CRIT:
+        after_player = [(crit, player_hp, enemy_hp - amount, used), (1 - crit, player_hp, enemy_hp, used)]
+    elif ability_ready and kind == combat_kernel.ABILITY_HEAL and player_hp < max_hp * heal_below:
+        after_player = [(1, min(max_hp, player_hp + amount), enemy_hp, used)]
+    elif ability_ready and kind == combat_kernel.ABILITY_DAMAGE:
+        after_player = [(1, player_hp, enemy_hp - amount, used)]
+    else:
+        after_player = [(1, player_hp, enemy_hp - columns["player_damage"][0], waited)]
+
+    # Enemy turn
+    enemy_damage = columns["enemy_damage"][0]
+    for probability, hp, foe_hp, next_wait in after_player:
+        if foe_hp <= 0:
+            yield probability, hp, 0, next_wait, "player"
+        elif hp - enemy_damage <= 0:
+            yield probability, 0, foe_hp, next_wait, "enemy"
+        else:
+            yield probability, hp - enemy_damage, foe_hp, next_wait, None
+
+
+def solve_distribution(character, enemy, policy="ability", heal_below=0.5, flee_below=0.25,
+                       max_turns=combat_system.MAX_BATTLE_TURNS, exact=False):
+    """
+    Exact outcome distribution of a matchup under one of the kernel policies
+
+    Returns a dictionary of probability tables: outcomes (by winner),
+    turns and character_health, plus expected_turns. With exact=True
+    probabilities are Fractions instead of floats.
+    """
+    if policy not in combat_kernel.KERNEL_POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+
+    columns = combat_kernel.build_fight_columns([character], [enemy])
+    escape = _probability(combat_system.ESCAPE_CHANCE, exact)
+    crit = _probability(columns["ability_chance"][0], exact)
+    one = Fraction(1) if exact else 1.0
+
+    outcomes = {}
+    turns = {}
+    health = {}
+    states = {(character["health"], enemy["health"], 0): one}
+
+    turn = 0
+    while states and turn < max_turns:
+        turn += 1
+        next_states = {}
+        for (player_hp, enemy_hp, wait), probability in states.items():
+            for step, hp, foe_hp, next_wait, winner in _round_transitions(
+                columns, policy, player_hp, enemy_hp, wait, escape, crit, heal_below, flee_below
+            ):
+                weight = probability * step
+                if winner is None:
+                    key = (hp, foe_hp, next_wait)
+                    next_states[key] = next_states.get(key, 0) + weight
+                else:
+                    outcomes[winner] = outcomes.get(winner, 0) + weight
+                    turns[turn] = turns.get(turn, 0) + weight
+                    health[hp] = health.get(hp, 0) + weight
+        states = next_states
+
+    for (player_hp, _, _), probability in states.items():
+        outcomes["draw"] = outcomes.get("draw", 0) + probability
+        turns[turn] = turns.get(turn, 0) + probability
+        health[player_hp] = health.get(player_hp, 0) + probability
+
+    return {
+        "outcomes": outcomes,
+        "turns": dict(sorted(turns.items())),
+        "character_health": dict(sorted(health.items())),
+        "expected_turns": sum(t * p for t, p in turns.items())
+    }
+
+
+def solve_matchup(character, enemy, policy="ability", **options):
+    """
+    Exact outcome distribution, using the closed form when it applies
+    """
+    if is_deterministic(character, enemy, policy):
+        max_turns = options.get("max_turns", combat_system.MAX_BATTLE_TURNS)
+        result = solve_deterministic(character, enemy, policy, max_turns)
+        one = Fraction(1) if options.get("exact") else 1.0
+        return {
+            "outcomes": {result["winner"]: one},
+            "turns": {result["turns"]: one},
+            "character_health": {result["character_health"]: one},
+            "expected_turns": result["turns"] * one
+        }
+    return solve_distribution(character, enemy, policy, **options)
+
+
+def win_probability(character, enemy, policy="ability", **options):
+    """Exact probability that the character wins the matchup."""
+    return solve_matchup(character, enemy, policy, **options)["outcomes"].get("player", 0)
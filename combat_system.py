@@ -9,8 +9,17 @@ AI Usage: [Document any AI assistance used]
 Handles combat mechanics
 """
 
+import bisect
+import random
+from array import array
+from types import MappingProxyType
+import battle_events
+import game_data
+import loot_system
 from custom_exceptions import (
+    InvalidDataFormatError,
     InvalidTargetError,
+    MissingDataFileError,
     CombatNotActiveError,
     CharacterDeadError,
     AbilityOnCooldownError
@@ -20,78 +29,306 @@ from custom_exceptions import (
 # ENEMY DEFINITIONS
 # ============================================================================
 
-def create_enemy(enemy_type):
-    enemy_type = enemy_type.lower()
-
-    enemies = {
-        "goblin": {
-            "name": "Goblin",
-            "health": 50,
-            "max_health": 50,
-            "strength": 8,
-            "magic": 2,
-            "xp_reward": 25,
-            "gold_reward": 10
-        },
-        "orc": {
-            "name": "Orc",
-            "health": 80,
-            "max_health": 80,
-            "strength": 12,
-            "magic": 5,
-            "xp_reward": 50,
-            "gold_reward": 25
-        },
-        "dragon": {
-            "name": "Dragon",
-            "health": 200,
-            "max_health": 200,
-            "strength": 25,
-            "magic": 15,
-            "xp_reward": 200,
-            "gold_reward": 100
-        }
+# Built-in enemies, used when data/enemies.txt is missing
+DEFAULT_ENEMIES = {
+    "goblin": {
+        "name": "Goblin",
+        "health": 50,
+        "max_health": 50,
+        "strength": 8,
+        "magic": 2,
+        "xp_reward": 25,
+        "gold_reward": 10
+    },
+    "orc": {
+        "name": "Orc",
+        "health": 80,
+        "max_health": 80,
+        "strength": 12,
+        "magic": 5,
+        "xp_reward": 50,
+        "gold_reward": 25
+    },
+    "dragon": {
+        "name": "Dragon",
+        "health": 200,
+        "max_health": 200,
+        "strength": 25,
+        "magic": 15,
+        "xp_reward": 200,
+        "gold_reward": 100
     }
+}
+
+# Fields copied from an enemy definition into each enemy instance
+ENEMY_FIELDS = ["enemy_id", "name", "health", "max_health", "strength", "magic", "xp_reward", "gold_reward"]
+
+# {enemy_type: flat enemy dict}, loaded on first use and never mutated;
+# _enemy_prototypes is the same data behind read-only views
+_enemy_templates = None
+_enemy_prototypes = None
+
+
+def register_enemies(enemy_dict):
+    """
+    Install enemy definitions (e.g. from game_data.load_enemies) as prototypes
+
+    Returns the read-only {enemy_type: prototype} registry.
+    """
+    global _enemy_templates, _enemy_prototypes
+
+    templates = {}
+    for enemy_type, enemy in enemy_dict.items():
+        # The registry key is the enemy's ID (loot tables are keyed on it)
+        enemy = dict(enemy, enemy_id=enemy_type.lower())
+        templates[enemy["enemy_id"]] = {key: enemy[key] for key in ENEMY_FIELDS}
+    _enemy_prototypes = MappingProxyType(
+        {enemy_type: MappingProxyType(template) for enemy_type, template in templates.items()}
+    )
+    _enemy_templates = templates
+    return _enemy_prototypes
+
+
+def get_enemy_prototypes():
+    """Return the read-only prototype registry, loading enemies.txt on first use."""
+    if _enemy_templates is None:
+        try:
+            register_enemies(game_data.load_enemies())
+        except MissingDataFileError:
+            register_enemies(DEFAULT_ENEMIES)
+    return _enemy_prototypes
+
+
+def get_enemy_types():
+    """List every enemy type create_enemy accepts."""
+    return list(get_enemy_prototypes())
+
 
-    if enemy_type not in enemies:
+def create_enemy(enemy_type):
+    templates = _enemy_templates
+    if templates is None:
+        get_enemy_prototypes()
+        templates = _enemy_templates
+
+    template = templates.get(enemy_type) or templates.get(enemy_type.lower())
+    if template is None:
         raise InvalidTargetError(f"Unknown enemy type: {enemy_type}")
 
-    return enemies[enemy_type].copy()
+    # Templates are flat, so a shallow copy is a full, independent enemy
+    return template.copy()
 
 
-def get_random_enemy_for_level(character_level):
-    if character_level <= 2:
-        return create_enemy("goblin")
-    elif character_level <= 5:
-        return create_enemy("orc")
-    else:
-        return create_enemy("dragon")
+# ============================================================================
+# SPAWN TABLES
+# ============================================================================
+
+# Built-in level bands, used when data/spawn_tables.txt is missing
+DEFAULT_SPAWN_TABLES = [
+    {"min_level": 1, "max_level": 2, "enemies": [("goblin", 1)]},
+    {"min_level": 3, "max_level": 5, "enemies": [("orc", 1)]},
+    {"min_level": 6, "max_level": 999, "enemies": [("dragon", 1)]}
+]
+
+# (sorted band start levels, alias sampler per band), loaded on first use
+_spawn_index = None
+
+
+def register_spawn_tables(bands):
+    """
+    Install level bands (e.g. from game_data.load_spawn_tables)
+
+    Bands must cover one contiguous level range (no gaps or overlaps).
+    Every band gets an alias sampler so a spawn roll is one bisect plus
+    one O(1) draw. Characters below the first band's MIN_LEVEL or above
+    the last band's MAX_LEVEL use the nearest band.
+    """
+    global _spawn_index
+
+    known = get_enemy_prototypes()
+    bands = game_data.validate_spawn_bands(bands)
+    starts = []
+    samplers = []
+    for band in bands:
+        for enemy_type, _ in band["enemies"]:
+            if enemy_type not in known:
+                raise InvalidTargetError(f"Unknown enemy type in spawn table: {enemy_type}")
+        starts.append(band["min_level"])
+        samplers.append(loot_system.create_sampler(
+            [enemy_type for enemy_type, _ in band["enemies"]],
+            [weight for _, weight in band["enemies"]]
+        ))
+
+    if not samplers:
+        raise InvalidDataFormatError("Spawn tables have no bands")
+    _spawn_index = (starts, samplers)
+    return _spawn_index
+
+
+def _get_spawn_index():
+    if _spawn_index is None:
+        try:
+            register_spawn_tables(game_data.load_spawn_tables())
+        except MissingDataFileError:
+            register_spawn_tables(DEFAULT_SPAWN_TABLES)
+    return _spawn_index
+
+
+def _spawn_band(starts, character_level):
+    """Index of the band containing character_level (bands are contiguous)."""
+    return max(bisect.bisect_right(starts, character_level) - 1, 0)
+
+
+def get_spawn_sampler(character_level):
+    """Alias sampler of the level band containing character_level."""
+    starts, samplers = _get_spawn_index()
+    return samplers[_spawn_band(starts, character_level)]
+
+
+def get_random_enemy_for_level(character_level, rng=random):
+    enemy_type = loot_system.sample(get_spawn_sampler(character_level), rng)
+    return create_enemy(enemy_type)
+
+
+def roll_spawn_types(levels, rng=random):
+    """
+    Roll one enemy type per character level
+
+    Levels are grouped by band (each distinct level is looked up once)
+    and every band's rolls come from one loot_system.sample_many call.
+    This is a plain Python loop, not a vectorized one.
+    """
+    starts, samplers = _get_spawn_index()
+    band_for_level = {}
+    positions = {}
+    for index, level in enumerate(levels):
+        band = band_for_level.get(level)
+        if band is None:
+            band = band_for_level[level] = _spawn_band(starts, level)
+        positions.setdefault(band, []).append(index)
+
+    types = [None] * sum(len(indices) for indices in positions.values())
+    for band, indices in positions.items():
+        for index, enemy_type in zip(indices, loot_system.sample_many(samplers[band], len(indices), rng)):
+            types[index] = enemy_type
+    return types
+
+
+def spawn_enemies_for_levels(levels, rng=random):
+    """Spawn one enemy for each character level, in order."""
+    return [create_enemy(enemy_type) for enemy_type in roll_spawn_types(levels, rng)]
+
+
+# ============================================================================
+# LOOT DROPS
+# ============================================================================
+
+# {enemy_type: alias sampler}, loaded on first use
+_loot_tables = None
+
+
+def register_loot_tables(loot_data_dict, items=None):
+    """
+    Install loot tables (e.g. from game_data.load_loot_tables)
+
+    Every drop must be an item ID in items (default: the registered item
+    catalog) or loot_system.NO_DROP.
+    """
+    global _loot_tables
+
+    if items is None:
+        items = game_data.get_item_registry()
+    for enemy_type, loot in loot_data_dict.items():
+        for item_id, _ in loot["drops"]:
+            if item_id != loot_system.NO_DROP and item_id not in items:
+                raise InvalidTargetError(f"Unknown item in loot table for {enemy_type}: {item_id}")
+    _loot_tables = loot_system.build_loot_tables(loot_data_dict)
+    return _loot_tables
+
+
+def get_loot_tables():
+    """Return the {enemy_type: sampler} loot tables, loading them on first use."""
+    if _loot_tables is None:
+        try:
+            items = game_data.get_item_registry() or game_data.load_items()
+            register_loot_tables(game_data.load_loot_tables(), items)
+        except MissingDataFileError:
+            register_loot_tables({})
+    return _loot_tables
+
+
+def get_victory_loot(enemy, rng=random):
+    """Item IDs dropped by a defeated enemy (empty if nothing dropped)."""
+    drop = loot_system.get_enemy_loot(enemy, get_loot_tables(), rng)
+    return [] if drop is None else [drop]
 
 
 # ============================================================================
 # COMBAT SYSTEM
 # ============================================================================
 
+# Player actions (menu choices 1, 2 and 3)
+ACTION_ATTACK = "attack"
+ACTION_ABILITY = "ability"
+ACTION_RUN = "run"
+
+MENU_ACTIONS = {"1": ACTION_ATTACK, "2": ACTION_ABILITY, "3": ACTION_RUN}
+
+# Battles that reach this many rounds end in a draw
+MAX_BATTLE_TURNS = 1000
+
+# Chance that an escape attempt succeeds
+ESCAPE_CHANCE = 0.5
+
+
 class SimpleBattle:
-    def __init__(self, character, enemy):
+    """
+    One character against one enemy, player acting first each round
+
+    Without a policy the player picks actions through input() and events
+    are rendered to the console; the same goes for interactive policies
+    such as ConsolePolicy. With any other policy (see the policy classes
+    below) the battle runs headless: actions come from
+    policy.choose_action(battle) and typed events only go to the given
+    battle_events.EventStream; with events=None no events are built.
+    """
+
+    def __init__(self, character, enemy, policy=None, events=None, rng=None):
         self.character = character
         self.enemy = enemy
         self.combat_active = True
         self.turn_count = 0
+        self.policy = policy
+        self.rng = rng if rng is not None else random
+        self.escaped = False
+        self.cooldowns = CooldownTracker(1)
+        self.ability_cooldown = get_ability_cooldown(character)
+        if events is None and (policy is None or getattr(policy, "interactive", False)):
+            events = battle_events.EventStream([battle_events.ConsoleSink()])
+        self.events = events
 
     def start_battle(self):
         if self.character["health"] <= 0:
             raise CharacterDeadError("Character cannot start battle while dead.")
 
-        display_battle_log("Battle begins!")
+        events = self.events
+        if events is not None:
+            events.emit(battle_events.BattleStartEvent(0, self.character["name"], self.enemy["name"]))
+        winner = None
 
         while self.combat_active:
-            display_combat_stats(self.character, self.enemy)
+            if self.turn_count >= MAX_BATTLE_TURNS:
+                self.combat_active = False
+                winner = "draw"
+                break
+            self.turn_count += 1
+
+            if events is not None:
+                events.emit(battle_events.TurnStartEvent(self.turn_count, self.character, self.enemy))
 
             # Player turn
             self.player_turn()
             winner = self.check_battle_end()
-            if winner:
+            if winner or not self.combat_active:
                 break
 
             # Enemy turn
@@ -100,49 +337,87 @@ class SimpleBattle:
             if winner:
                 break
 
-        # Determine results
+        result = self.build_result(winner)
+        if events is not None:
+            events.flush()
+        return result
+
+    def build_result(self, winner):
+        """Structured record of a finished battle."""
+        events = self.events
         if winner == "player":
             rewards = get_victory_rewards(self.enemy)
-            display_battle_log("You won the battle!")
-            return {
-                "winner": "player",
-                "xp_gained": rewards["xp"],
-                "gold_gained": rewards["gold"]
-            }
+            xp, gold = rewards["xp"], rewards["gold"]
+            if events is not None:
+                events.emit(battle_events.DeathEvent(self.turn_count, self.enemy["name"]))
+                events.emit(battle_events.RewardEvent(self.turn_count, xp, gold))
         else:
-            display_battle_log("You were defeated!")
-            return {
-                "winner": "enemy",
-                "xp_gained": 0,
-                "gold_gained": 0
-            }
+            if self.escaped:
+                winner = "escaped"
+            elif winner == "enemy" and events is not None:
+                events.emit(battle_events.DeathEvent(self.turn_count, self.character["name"]))
+            xp, gold = 0, 0
+
+        return {
+            "winner": winner,
+            "xp_gained": xp,
+            "gold_gained": gold,
+            "turns": self.turn_count,
+            "character_health": self.character["health"],
+            "enemy_health": self.enemy["health"]
+        }
 
     def player_turn(self):
         if not self.combat_active:
             raise CombatNotActiveError()
 
-        print("\nYour turn:")
-        print("1. Basic Attack")
-        print("2. Special Ability")
-        print("3. Run")
-
-        choice = input("Choose action: ").strip()
-
-        if choice == "1":
-            damage = self.calculate_damage(self.character, self.enemy)
-            self.apply_damage(self.enemy, damage)
-            display_battle_log(f"You attack for {damage} damage!")
-        elif choice == "2":
-            result = use_special_ability(self.character, self.enemy)
-            display_battle_log(result)
-        elif choice == "3":
-            if self.attempt_escape():
-                display_battle_log("You successfully escaped!")
-                return
-            else:
-                display_battle_log("Failed to escape!")
+        if self.policy is not None:
+            action = self.policy.choose_action(self)
         else:
-            display_battle_log("Invalid choice. You lose your turn.")
+            # Show everything that happened before waiting on the player
+            if self.events is not None:
+                self.events.flush()
+            action = prompt_player_action(self)
+
+        self.perform_action(action)
+
+    def perform_action(self, action):
+        """Carry out one player action."""
+        events = self.events
+        character = self.character
+        enemy = self.enemy
+
+        if action == ACTION_ATTACK:
+            damage = self.calculate_damage(character, enemy)
+            self.apply_damage(enemy, damage)
+            if events is not None:
+                events.emit(battle_events.AttackEvent(
+                    self.turn_count, character["name"], enemy["name"], damage, enemy["health"]
+                ))
+        elif action == ACTION_ABILITY:
+            # A headless policy choosing a cooling-down ability loses the turn
+            try:
+                if events is None:
+                    self.use_ability()
+                else:
+                    enemy_before = enemy["health"]
+                    character_before = character["health"]
+                    message = self.use_ability()
+                    events.emit(battle_events.AbilityEvent(
+                        self.turn_count, character["name"], message,
+                        enemy_before - enemy["health"], character["health"] - character_before
+                    ))
+            except AbilityOnCooldownError:
+                if events is not None:
+                    events.emit(battle_events.SkippedTurnEvent(
+                        self.turn_count, character["name"], action, "cooldown"
+                    ))
+        elif action == ACTION_RUN:
+            success = self.attempt_escape()
+            if events is not None:
+                events.emit(battle_events.EscapeEvent(self.turn_count, character["name"], success))
+        elif events is not None:
+            events.emit(battle_events.SkippedTurnEvent(self.turn_count, character["name"], action))
 
     def enemy_turn(self):
         if not self.combat_active:
@@ -150,7 +425,10 @@ class SimpleBattle:
 
         damage = self.calculate_damage(self.enemy, self.character)
         self.apply_damage(self.character, damage)
-        display_battle_log(f"{self.enemy['name']} attacks for {damage} damage!")
+        if self.events is not None:
+            self.events.emit(battle_events.AttackEvent(
+                self.turn_count, self.enemy["name"], self.character["name"], damage, self.character["health"]
+            ))
 
     def calculate_damage(self, attacker, defender):
         base = attacker["strength"] - (defender["strength"] // 4)
@@ -169,55 +447,225 @@ class SimpleBattle:
         return None
 
     def attempt_escape(self):
-        success = random.random() < 0.5
+        success = self.rng.random() < ESCAPE_CHANCE
         if success:
             self.combat_active = False
+            self.escaped = True
         return success
 
+    def ability_ready(self):
+        """True if the character's special ability can be used this turn."""
+        return self.cooldowns.is_ready(0, self.turn_count)
+
+    def use_ability(self):
+        """
+        Use the character's special ability and start its cooldown
+
+        Raises AbilityOnCooldownError if it is not ready this turn.
+        """
+        if not self.ability_ready():
+            raise AbilityOnCooldownError(
+                f"Ability ready in {self.cooldowns.remaining(0, self.turn_count)} turn(s)."
+            )
+        self.cooldowns.trigger(0, self.turn_count, self.ability_cooldown)
+        return use_special_ability(self.character, self.enemy, self.rng)
+
+
+# ============================================================================
+# BATTLE POLICIES
+# ============================================================================
+
+class AlwaysAttackPolicy:
+    """Basic attack every turn."""
+
+    def choose_action(self, battle):
+        return ACTION_ATTACK
+
+
+class AbilityWhenReadyPolicy:
+    """
+    Use the special ability whenever it is ready, otherwise attack
+
+    Healing abilities are only used below heal_below of max health.
+    """
+
+    def __init__(self, heal_below=0.5):
+        self.heal_below = heal_below
+
+    def choose_action(self, battle):
+        if not battle.ability_ready():
+            return ACTION_ATTACK
+        character = battle.character
+        if character["class"].lower() == "cleric":
+            if character["health"] >= character["max_health"] * self.heal_below:
+                return ACTION_ATTACK
+        return ACTION_ABILITY
+
+
+class FleeBelowPolicy:
+    """Try to run below threshold of max health, otherwise follow fallback."""
+
+    def __init__(self, threshold=0.25, fallback=None):
+        self.threshold = threshold
+        self.fallback = fallback if fallback is not None else AlwaysAttackPolicy()
+
+    def choose_action(self, battle):
+        character = battle.character
+        if character["health"] < character["max_health"] * self.threshold:
+            return ACTION_RUN
+        return self.fallback.choose_action(battle)
+
+
+class ScriptedPolicy:
+    """Play a fixed list of actions, then repeat the default action."""
+
+    def __init__(self, actions, default=ACTION_ATTACK):
+        self.actions = list(actions)
+        self.default = default
+        self.position = 0
+
+    def choose_action(self, battle):
+        if self.position < len(self.actions):
+            action = self.actions[self.position]
+            self.position += 1
+            return action
+        return self.default
+
+
+class ConsolePolicy:
+    """Ask the player through the battle menu (input())."""
+
+    interactive = True
+
+    def choose_action(self, battle):
+        if battle.events is not None:
+            battle.events.flush()
+        return prompt_player_action(battle)
+
+
+def prompt_player_action(battle=None):
+    """
+    Show the battle menu and return the chosen action (None if invalid)
+
+    With a battle, choosing the special ability while it is on cooldown
+    shows the remaining turns and asks again.
+    """
+    while True:
+        print("\nYour turn:")
+        print("1. Basic Attack")
+        print("2. Special Ability")
+        print("3. Run")
+
+        choice = input("Choose action: ").strip()
+        action = MENU_ACTIONS.get(choice)
+        if action != ACTION_ABILITY or battle is None or battle.ability_ready():
+            return action
+        turns = battle.cooldowns.remaining(0, battle.turn_count)
+        print(f"Your special ability is on cooldown for {turns} more turn(s).")
+
+
+def run_headless_battle(character, enemy, policy, events=None, rng=None):
+    """Fight a battle without input() or printing; returns the result record."""
+    return SimpleBattle(character, enemy, policy, events, rng).start_battle()
+
 
 # ============================================================================
 # SPECIAL ABILITIES
 # ============================================================================
 
-def use_special_ability(character, enemy):
-    char_class = character["class"].lower()
-
-    if char_class == "warrior":
-        return warrior_power_strike(character, enemy)
-    elif char_class == "mage":
-        return mage_fireball(character, enemy)
-    elif char_class == "rogue":
-        return rogue_critical_strike(character, enemy)
-    elif char_class == "cleric":
-        return cleric_heal(character)
-    else:
+def use_special_ability(character, enemy, rng=random):
+    ability = CLASS_ABILITIES.get(character["class"].lower())
+    if ability is None:
         return "No special ability available."
+    return ability["use"](character, enemy, rng)
 
-def warrior_power_strike(character, enemy):
-    damage = character["strength"] * 2
+def warrior_power_strike(character, enemy, rng=random):
+    damage = get_ability_amount(character)
     enemy["health"] = max(0, enemy["health"] - damage)
     return f"Warrior Power Strike! You deal {damage} damage."
 
-def mage_fireball(character, enemy):
-    damage = character["magic"] * 2
+def mage_fireball(character, enemy, rng=random):
+    damage = get_ability_amount(character)
     enemy["health"] = max(0, enemy["health"] - damage)
     return f"Mage Fireball! {damage} damage scorches the enemy!"
 
-def rogue_critical_strike(character, enemy):
-    if random.random() < 0.5:
-        damage = character["strength"] * 3
+def rogue_critical_strike(character, enemy, rng=random):
+    if rng.random() < CLASS_ABILITIES["rogue"]["chance"]:
+        damage = get_ability_amount(character)
         enemy["health"] = max(0, enemy["health"] - damage)
         return f"Critical Hit! You deal {damage} massive damage!"
     else:
         return "Critical Strike failed! No damage dealt."
 
-def cleric_heal(character):
-    healed = 30
+def cleric_heal(character, enemy=None, rng=random):
+    healed = get_ability_amount(character)
     before = character["health"]
     character["health"] = min(character["max_health"], character["health"] + healed)
     return f"Cleric Heal! Restored {character['health'] - before} HP."
 
 
+# Class -> ability. Every "use" callable takes (character, enemy, rng);
+# cooldown is the number of turns from one use to the next (1 = every turn).
+# effect is "damage" (to the enemy) or "heal" (the character); the amount
+# is stat * multiplier, or a flat amount, and lands with probability chance.
+# The batch kernel and the solver read these fields instead of the callables.
+CLASS_ABILITIES = {
+    "warrior": {"name": "Power Strike", "use": warrior_power_strike, "cooldown": 2,
+                "effect": "damage", "stat": "strength", "multiplier": 2, "chance": 1.0},
+    "mage": {"name": "Fireball", "use": mage_fireball, "cooldown": 3,
+             "effect": "damage", "stat": "magic", "multiplier": 2, "chance": 1.0},
+    "rogue": {"name": "Critical Strike", "use": rogue_critical_strike, "cooldown": 1,
+              "effect": "damage", "stat": "strength", "multiplier": 3, "chance": 0.5},
+    "cleric": {"name": "Heal", "use": cleric_heal, "cooldown": 3,
+               "effect": "heal", "amount": 30, "chance": 1.0}
+}
+
+
+def get_ability(character):
+    """The character's CLASS_ABILITIES entry (None if the class has none)."""
+    return CLASS_ABILITIES.get(character.get("class", "").lower())
+
+
+def get_ability_cooldown(character):
+    """Turns between uses of the character's special ability."""
+    ability = get_ability(character)
+    return ability["cooldown"] if ability is not None else 1
+
+
+def get_ability_amount(character):
+    """Damage or healing of the character's ability when it lands (0 if none)."""
+    ability = get_ability(character)
+    if ability is None:
+        return 0
+    if "stat" in ability:
+        return character[ability["stat"]] * ability["multiplier"]
+    return ability["amount"]
+
+
+class CooldownTracker:
+    """
+    Ability cooldowns for a fixed number of combatant slots
+
+    Each slot stores the turn at which its ability is next ready, in an
+    array('i'). Nothing is ticked each turn: checking readiness is one
+    comparison against the current turn number.
+    """
+
+    def __init__(self, slots=1):
+        self.ready_at = array("i", [0]) * slots
+
+    def is_ready(self, slot, turn):
+        return turn >= self.ready_at[slot]
+
+    def remaining(self, slot, turn):
+        """Turns left before the slot's ability is ready (0 if ready)."""
+        return max(0, self.ready_at[slot] - turn)
+
+    def trigger(self, slot, turn, cooldown):
+        """Record a use at turn; the ability is ready again at turn + cooldown."""
+        self.ready_at[slot] = turn + cooldown
+
+
 # ============================================================================
 # COMBAT UTILITIES
 # ============================================================================
@@ -114,6 +114,10 @@ class InvalidItemTypeError(InventoryError):
     """Raised when item type is not recognized"""
     pass
 
+class InvalidQuantityError(InventoryError):
+    """Raised when an item quantity, page or page size is not positive"""
+    pass
+
 # Save/Load Exceptions
 class SaveFileCorruptedError(GameError):
     """Raised when save file cannot be loaded due to corruption"""
@@ -10,12 +10,17 @@ This module handles loading and validating game data from text files.
 """
 
 import os
+from types import MappingProxyType
 from custom_exceptions import (
     InvalidDataFormatError,
     MissingDataFileError,
     CorruptedDataError
 )
 
+# Process-wide item catalog: (version, read-only {item_id: item}).
+# Replaced as a whole by register_item_catalog, never mutated in place.
+_item_registry = (0, MappingProxyType({}))
+
 # ============================================================================
 # DATA LOADING FUNCTIONS
 # ============================================================================
@@ -83,6 +88,130 @@ def load_items(filename="data/items.txt"):
     return item_dict
 
 
+def load_loot_tables(filename="data/loot_tables.txt"):
+    """
+    Load enemy loot tables from file
+    """
+    if not os.path.exists(filename):
+        raise MissingDataFileError(f"Loot table file '{filename}' not found.")
+
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            content = f.read()
+    except Exception:
+        raise CorruptedDataError("Unable to read loot table file.")
+
+    raw_blocks = content.strip().split("\n\n")
+    loot_dict = {}
+
+    for block in raw_blocks:
+        lines = [line.strip() for line in block.split("\n") if line.strip()]
+        try:
+            loot_data = parse_loot_block(lines)
+            validate_loot_data(loot_data)
+            loot_dict[loot_data["enemy"]] = loot_data
+        except InvalidDataFormatError:
+            raise
+        except Exception:
+            raise CorruptedDataError("Corrupted loot block detected.")
+
+    return loot_dict
+
+
+def load_enemies(filename="data/enemies.txt"):
+    """
+    Load enemy definitions from file
+    """
+    if not os.path.exists(filename):
+        raise MissingDataFileError(f"Enemy file '{filename}' not found.")
+
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            content = f.read()
+    except Exception:
+        raise CorruptedDataError("Unable to read enemy file.")
+
+    raw_blocks = content.strip().split("\n\n")
+    enemy_dict = {}
+
+    for block in raw_blocks:
+        lines = [line.strip() for line in block.split("\n") if line.strip()]
+        try:
+            enemy = parse_enemy_block(lines)
+            validate_enemy_data(enemy)
+            enemy_dict[enemy["enemy_id"]] = enemy
+        except InvalidDataFormatError:
+            raise
+        except Exception:
+            raise CorruptedDataError("Corrupted enemy block detected.")
+
+    return enemy_dict
+
+
+def load_spawn_tables(filename="data/spawn_tables.txt"):
+    """
+    Load level-banded enemy spawn tables from file
+
+    Returns a list of bands sorted by MIN_LEVEL.
+    """
+    if not os.path.exists(filename):
+        raise MissingDataFileError(f"Spawn table file '{filename}' not found.")
+
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            content = f.read()
+    except Exception:
+        raise CorruptedDataError("Unable to read spawn table file.")
+
+    raw_blocks = content.strip().split("\n\n")
+    bands = []
+
+    for block in raw_blocks:
+        lines = [line.strip() for line in block.split("\n") if line.strip()]
+        try:
+            band = parse_spawn_block(lines)
+            validate_spawn_data(band)
+            bands.append(band)
+        except InvalidDataFormatError:
+            raise
+        except Exception:
+            raise CorruptedDataError("Corrupted spawn block detected.")
+
+    return validate_spawn_bands(bands)
+
+
+# ============================================================================
+# ITEM REGISTRY
+# ============================================================================
+
+def register_item_catalog(item_dict):
+    """
+    Install a loaded item catalog as the shared read-only registry
+
+    The previous catalog is swapped out in a single assignment, so a hot
+    reload never exposes a half-built registry. Returns the new version.
+    """
+    global _item_registry
+
+    frozen = {}
+    for item_id, item in item_dict.items():
+        frozen[item_id] = MappingProxyType(dict(item))
+
+    version = _item_registry[0] + 1
+    _item_registry = (version, MappingProxyType(frozen))
+    return version
+
+
+def get_item_registry():
+    """Return the current read-only {item_id: item} registry"""
+    return _item_registry[1]
+
+
+def get_item_registry_version():
+    """Return the version number of the current item registry"""
+    return _item_registry[0]
+
+
 # ============================================================================
 # VALIDATION
 # ============================================================================
@@ -132,6 +261,87 @@ def validate_item_data(item_dict):
     return True
 
 
+def validate_loot_data(loot_dict):
+    required = ["enemy", "drops"]
+
+    for key in required:
+        if key not in loot_dict:
+            raise InvalidDataFormatError(f"Missing field in loot table: {key}")
+
+    if not loot_dict["drops"]:
+        raise InvalidDataFormatError("Loot table has no drops")
+
+    for item_id, weight in loot_dict["drops"]:
+        if weight < 0:
+            raise InvalidDataFormatError(f"Negative drop weight for {item_id}")
+
+    if sum(weight for _, weight in loot_dict["drops"]) <= 0:
+        raise InvalidDataFormatError("Loot table weights must not all be zero")
+
+    return True
+
+
+def validate_enemy_data(enemy_dict):
+    required = [
+        "enemy_id", "name", "health", "max_health", "strength",
+        "magic", "xp_reward", "gold_reward"
+    ]
+
+    for key in required:
+        if key not in enemy_dict:
+            raise InvalidDataFormatError(f"Missing field in enemy: {key}")
+
+    for key in required[2:]:
+        if not isinstance(enemy_dict[key], int):
+            raise InvalidDataFormatError(f"{key} must be an integer")
+
+    if enemy_dict["health"] <= 0:
+        raise InvalidDataFormatError("Enemy health must be positive")
+
+    return True
+
+
+def validate_spawn_data(spawn_dict):
+    required = ["min_level", "max_level", "enemies"]
+
+    for key in required:
+        if key not in spawn_dict:
+            raise InvalidDataFormatError(f"Missing field in spawn table: {key}")
+
+    if spawn_dict["min_level"] > spawn_dict["max_level"]:
+        raise InvalidDataFormatError("Spawn band MIN_LEVEL is above MAX_LEVEL")
+
+    if not spawn_dict["enemies"]:
+        raise InvalidDataFormatError("Spawn table has no enemies")
+
+    for enemy_type, weight in spawn_dict["enemies"]:
+        if weight < 0:
+            raise InvalidDataFormatError(f"Negative spawn weight for {enemy_type}")
+
+    if sum(weight for _, weight in spawn_dict["enemies"]) <= 0:
+        raise InvalidDataFormatError("Spawn table weights must not all be zero")
+
+    return True
+
+
+def validate_spawn_bands(bands):
+    """
+    Check that spawn bands cover one contiguous level range
+
+    Returns the bands sorted by MIN_LEVEL; overlaps and gaps between
+    bands raise InvalidDataFormatError.
+    """
+    bands = sorted(bands, key=lambda band: band["min_level"])
+    for previous, band in zip(bands, bands[1:]):
+        if band["min_level"] <= previous["max_level"]:
+            raise InvalidDataFormatError(f"Spawn bands overlap at level {band['min_level']}")
+        if band["min_level"] > previous["max_level"] + 1:
+            raise InvalidDataFormatError(
+                f"No spawn band covers levels {previous['max_level'] + 1}-{band['min_level'] - 1}"
+            )
+    return bands
+
+
 # ============================================================================
 # DEFAULT FILE CREATION
 # ============================================================================
@@ -204,6 +414,7 @@ def parse_quest_block(lines):
                 quest["required_level"] = int(value)
             elif key == "PREREQUISITE":
                 quest["prerequisite"] = value
+                quest["prerequisite_groups"] = parse_prerequisites(value)
             else:
                 raise InvalidDataFormatError(f"Unknown quest field: {key}")
 
@@ -213,6 +424,27 @@ def parse_quest_block(lines):
     return quest
 
 
+def parse_prerequisites(value):
+    """
+    Converts a PREREQUISITE value into OR-groups of AND-ed quest IDs
+
+      NONE        -> []
+      a, b        -> [["a", "b"]]          (a AND b)
+      a, b | c    -> [["a", "b"], ["c"]]   ((a AND b) OR c)
+    """
+    value = value.strip()
+    if value == "NONE":
+        return []
+
+    groups = []
+    for option in value.split("|"):
+        group = [quest_id.strip() for quest_id in option.split(",") if quest_id.strip()]
+        if not group:
+            raise InvalidDataFormatError(f"Empty prerequisite group in: {value}")
+        groups.append(group)
+    return groups
+
+
 def parse_item_block(lines):
     """
     Converts item block to dictionary
@@ -246,3 +478,116 @@ def parse_item_block(lines):
         raise InvalidDataFormatError("Invalid numeric value in item data.")
 
     return item
+
+
+def parse_loot_block(lines):
+    """
+    Converts loot block to dictionary
+
+    DROPS is a comma-separated list of item_id:weight pairs; the item ID
+    NONE means "no drop".
+    """
+    loot = {}
+    try:
+        for line in lines:
+            if ": " not in line:
+                raise InvalidDataFormatError(f"Bad line format: {line}")
+
+            key, value = line.split(": ", 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key == "ENEMY":
+                loot["enemy"] = value.lower()
+            elif key == "DROPS":
+                drops = []
+                for entry in value.split(","):
+                    if ":" not in entry:
+                        raise InvalidDataFormatError(f"Bad drop format: {entry}")
+                    item_id, weight = entry.split(":", 1)
+                    drops.append((item_id.strip(), int(weight)))
+                loot["drops"] = drops
+            else:
+                raise InvalidDataFormatError(f"Unknown loot field: {key}")
+
+    except ValueError:
+        raise InvalidDataFormatError("Invalid numeric value in loot data.")
+
+    return loot
+
+
+def parse_enemy_block(lines):
+    """
+    Converts:
+      ENEMY_ID: goblin
+    into a dict (HEALTH sets both health and max_health)
+    """
+    enemy = {}
+    try:
+        for line in lines:
+            if ": " not in line:
+                raise InvalidDataFormatError(f"Bad line format: {line}")
+
+            key, value = line.split(": ", 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key == "ENEMY_ID":
+                enemy["enemy_id"] = value.lower()
+            elif key == "NAME":
+                enemy["name"] = value
+            elif key == "HEALTH":
+                enemy["health"] = int(value)
+                enemy["max_health"] = int(value)
+            elif key == "STRENGTH":
+                enemy["strength"] = int(value)
+            elif key == "MAGIC":
+                enemy["magic"] = int(value)
+            elif key == "XP_REWARD":
+                enemy["xp_reward"] = int(value)
+            elif key == "GOLD_REWARD":
+                enemy["gold_reward"] = int(value)
+            else:
+                raise InvalidDataFormatError(f"Unknown enemy field: {key}")
+
+    except ValueError:
+        raise InvalidDataFormatError("Invalid numeric value in enemy data.")
+
+    return enemy
+
+
+def parse_spawn_block(lines):
+    """
+    Converts spawn block to dictionary
+
+    ENEMIES is a comma-separated list of enemy_type:weight pairs.
+    """
+    band = {}
+    try:
+        for line in lines:
+            if ": " not in line:
+                raise InvalidDataFormatError(f"Bad line format: {line}")
+
+            key, value = line.split(": ", 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key == "MIN_LEVEL":
+                band["min_level"] = int(value)
+            elif key == "MAX_LEVEL":
+                band["max_level"] = int(value)
+            elif key == "ENEMIES":
+                enemies = []
+                for entry in value.split(","):
+                    if ":" not in entry:
+                        raise InvalidDataFormatError(f"Bad spawn format: {entry}")
+                    enemy_type, weight = entry.split(":", 1)
+                    enemies.append((enemy_type.strip().lower(), int(weight)))
+                band["enemies"] = enemies
+            else:
+                raise InvalidDataFormatError(f"Unknown spawn field: {key}")
+
+    except ValueError:
+        raise InvalidDataFormatError("Invalid numeric value in spawn data.")
+
+    return band
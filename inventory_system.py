@@ -9,16 +9,23 @@ AI Usage: [Document any AI assistance used]
 This module handles inventory management, item usage, and equipment.
 """
 
+import bisect
+import character_manager
+import game_data
 from custom_exceptions import (
     InventoryFullError,
     ItemNotFoundError,
     InsufficientResourcesError,
-    InvalidItemTypeError
+    InvalidItemTypeError,
+    InvalidQuantityError
 )
 
 # Maximum inventory size
 MAX_INVENTORY_SIZE = 20
 
+# Number of shop entries shown per page
+SHOP_PAGE_SIZE = 10
+
 # ============================================================================
 # INVENTORY MANAGEMENT
 # ============================================================================
@@ -70,13 +77,16 @@ def clear_inventory(character):
 # ITEM USAGE
 # ============================================================================
 
-def use_item(character, item_id, item_data):
+def use_item(character, item_id, item_data=None):
     """
-    Use a consumable item
+    Use a consumable item (item_data defaults to the registry entry)
     """
     if item_id not in character['inventory']:
         raise ItemNotFoundError("Item not in inventory")
 
+    if item_data is None:
+        item_data = get_item_definition(item_id)
+
     if item_data['type'] != 'consumable':
         raise InvalidItemTypeError("Only consumables can be used")
 
@@ -88,13 +98,16 @@ def use_item(character, item_id, item_data):
     return f"{character['name']} used {item_id} and gained {stat} +{value}."
 
 
-def equip_weapon(character, item_id, item_data):
+def equip_weapon(character, item_id, item_data=None):
     """
-    Equip a weapon
+    Equip a weapon (item_data defaults to the registry entry)
     """
     if item_id not in character['inventory']:
         raise ItemNotFoundError("Weapon not in inventory")
 
+    if item_data is None:
+        item_data = get_item_definition(item_id)
+
     if item_data['type'] != 'weapon':
         raise InvalidItemTypeError("This item is not a weapon")
 
@@ -103,21 +116,24 @@ def equip_weapon(character, item_id, item_data):
         unequip_weapon(character)
 
     stat, value = parse_item_effect(item_data['effect'])
-    apply_stat_effect(character, stat, value)
 
     character['inventory'].remove(item_id)
     character['equipped_weapon'] = item_id
+    character_manager.set_stat_modifier(character, 'equipped_weapon', stat, value)
 
     return f"{character['name']} equipped weapon: {item_id} (+{value} {stat})"
 
 
-def equip_armor(character, item_id, item_data):
+def equip_armor(character, item_id, item_data=None):
     """
-    Equip armor
+    Equip armor (item_data defaults to the registry entry)
     """
     if item_id not in character['inventory']:
         raise ItemNotFoundError("Armor not in inventory")
 
+    if item_data is None:
+        item_data = get_item_definition(item_id)
+
     if item_data['type'] != 'armor':
         raise InvalidItemTypeError("This item is not armor")
 
@@ -125,10 +141,10 @@ def equip_armor(character, item_id, item_data):
         unequip_armor(character)
 
     stat, value = parse_item_effect(item_data['effect'])
-    apply_stat_effect(character, stat, value)
 
     character['inventory'].remove(item_id)
     character['equipped_armor'] = item_id
+    character_manager.set_stat_modifier(character, 'equipped_armor', stat, value)
 
     return f"Equipped armor: {item_data['name']} (+{value} {stat})"
 
@@ -144,12 +160,9 @@ def unequip_weapon(character):
     if len(character['inventory']) >= MAX_INVENTORY_SIZE:
         raise InventoryFullError("No space to unequip weapon")
 
-    # Remove effect
-    stat, value = parse_item_effect(character['item_data'][weapon_id]['effect'])
-    apply_stat_effect(character, stat, -value)
-
     character['inventory'].append(weapon_id)
     character['equipped_weapon'] = None
+    character_manager.remove_stat_modifier(character, 'equipped_weapon')
 
     return weapon_id
 
@@ -165,11 +178,9 @@ def unequip_armor(character):
     if len(character['inventory']) >= MAX_INVENTORY_SIZE:
         raise InventoryFullError("No space to unequip armor")
 
-    stat, value = parse_item_effect(character['item_data'][armor_id]['effect'])
-    apply_stat_effect(character, stat, -value)
-
     character['inventory'].append(armor_id)
     character['equipped_armor'] = None
+    character_manager.remove_stat_modifier(character, 'equipped_armor')
 
     return armor_id
 
@@ -206,6 +217,197 @@ def sell_item(character, item_id, item_data):
 
     return sell_price
 
+
+def purchase_items(character, basket, item_data_dict):
+    """
+    Purchase a basket of (item_id, quantity) pairs in one transaction
+
+    Gold and inventory space are checked for the whole basket before
+    anything changes; if applying the basket fails, the character is
+    restored to its original gold and inventory.
+    """
+    total_cost = 0
+    total_quantity = 0
+    for item_id, quantity in basket:
+        if item_id not in item_data_dict:
+            raise ItemNotFoundError(f"Item '{item_id}' not found")
+        if quantity < 1:
+            raise InvalidQuantityError("Quantity must be at least 1")
+        total_cost += item_data_dict[item_id]['cost'] * quantity
+        total_quantity += quantity
+
+    if character['gold'] < total_cost:
+        raise InsufficientResourcesError("Not enough gold")
+
+    if len(character['inventory']) + total_quantity > MAX_INVENTORY_SIZE:
+        raise InventoryFullError("Not enough inventory space")
+
+    original_gold = character['gold']
+    original_size = len(character['inventory'])
+    try:
+        new_items = []
+        for item_id, quantity in basket:
+            new_items.extend([item_id] * quantity)
+        character['inventory'].extend(new_items)
+        character['gold'] -= total_cost
+    except Exception:
+        del character['inventory'][original_size:]
+        character['gold'] = original_gold
+        raise
+
+    return total_cost
+
+
+def sell_items(character, basket, item_data_dict):
+    """
+    Sell a basket of (item_id, quantity) pairs for 50% cost each
+
+    Every item must be in the inventory in the requested quantity before
+    anything is sold; on failure the character is left unchanged.
+    """
+    wanted = {}
+    for item_id, quantity in basket:
+        if item_id not in item_data_dict:
+            raise ItemNotFoundError(f"Item '{item_id}' not found")
+        if quantity < 1:
+            raise InvalidQuantityError("Quantity must be at least 1")
+        wanted[item_id] = wanted.get(item_id, 0) + quantity
+
+    owned = {}
+    for item_id in character['inventory']:
+        if item_id in wanted:
+            owned[item_id] = owned.get(item_id, 0) + 1
+
+    for item_id, quantity in wanted.items():
+        if owned.get(item_id, 0) < quantity:
+            raise ItemNotFoundError(f"Not enough '{item_id}' in inventory")
+
+    total_price = 0
+    for item_id, quantity in wanted.items():
+        total_price += (item_data_dict[item_id]['cost'] // 2) * quantity
+
+    # Rebuild the inventory in one pass, dropping the sold copies
+    original_inventory = character['inventory'][:]
+    original_gold = character['gold']
+    try:
+        kept = []
+        for item_id in original_inventory:
+            if wanted.get(item_id, 0) > 0:
+                wanted[item_id] -= 1
+            else:
+                kept.append(item_id)
+        character['inventory'][:] = kept
+        character['gold'] += total_price
+    except Exception:
+        character['inventory'][:] = original_inventory
+        character['gold'] = original_gold
+        raise
+
+    return total_price
+
+# ============================================================================
+# SHOP INDEX
+# ============================================================================
+
+def build_shop_index(item_data_dict):
+    """
+    Build sorted cost arrays for the shop
+
+    Items are bucketed by type ("weapon") and by type and stat
+    ("consumable:health"). Each bucket keeps parallel lists of costs and
+    item IDs sorted by (cost, item_id) so queries can use bisect.
+    """
+    buckets = {}
+    for item_id, item in item_data_dict.items():
+        stat, _ = parse_item_effect(item['effect'])
+        for key in (item['type'], f"{item['type']}:{stat}"):
+            buckets.setdefault(key, []).append((item['cost'], item_id))
+
+    shop_index = {}
+    for key, entries in buckets.items():
+        entries.sort()
+        shop_index[key] = {
+            "costs": [cost for cost, _ in entries],
+            "ids": [item_id for _, item_id in entries]
+        }
+    return shop_index
+
+
+def get_items_in_price_range(shop_index, item_type, min_cost, max_cost,
+                             page=1, page_size=SHOP_PAGE_SIZE):
+    """
+    Return one page of items of a type whose cost is in [min_cost, max_cost]
+
+    item_type may also be a "type:stat" key such as "consumable:health".
+    """
+    if page < 1 or page_size < 1:
+        raise InvalidQuantityError("Page and page size must be positive")
+
+    bucket = shop_index.get(item_type)
+    if bucket is None:
+        return _make_shop_page([], 0, page, page_size)
+
+    costs = bucket["costs"]
+    lo = bisect.bisect_left(costs, min_cost)
+    hi = bisect.bisect_right(costs, max_cost)
+
+    start = lo + (page - 1) * page_size
+    end = min(hi, start + page_size)
+    return _make_shop_page(bucket["ids"][start:end], max(0, hi - lo), page, page_size)
+
+
+def get_affordable_items(shop_index, item_type, gold, page=1, page_size=SHOP_PAGE_SIZE):
+    """Return one page of items of a type costing at most gold"""
+    return get_items_in_price_range(shop_index, item_type, 0, gold, page, page_size)
+
+
+def get_cheapest_item(shop_index, item_type, stat=None):
+    """
+    Return the cheapest item ID of a type (optionally restoring/boosting stat)
+
+    Returns None if no item matches.
+    """
+    key = item_type if stat is None else f"{item_type}:{stat}"
+    bucket = shop_index.get(key)
+    if not bucket:
+        return None
+    return bucket["ids"][0]
+
+
+def _make_shop_page(item_ids, total_items, page, page_size):
+    """Package a page of shop results"""
+    return {
+        "items": item_ids,
+        "page": page,
+        "total_pages": (total_items + page_size - 1) // page_size,
+        "total_items": total_items
+    }
+
+# ============================================================================
+# ITEM REGISTRY
+# ============================================================================
+
+def get_item_definition(item_id):
+    """
+    Look up an item in the shared registry (see game_data.register_item_catalog)
+    """
+    item = game_data.get_item_registry().get(item_id)
+    if item is None:
+        raise ItemNotFoundError(f"Item '{item_id}' not found")
+    return item
+
+
+def reload_item_catalog(item_data_dict, characters=()):
+    """
+    Hot-swap the item registry and refresh stats of the given characters
+
+    Returns the new registry version.
+    """
+    version = game_data.register_item_catalog(item_data_dict)
+    for character in characters:
+        character_manager.refresh_derived_stats(character)
+    return version
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -225,6 +427,11 @@ def apply_stat_effect(character, stat_name, value):
     if stat_name not in character:
         return
 
+    # Permanent boosts to derived stats go through the base stat
+    if stat_name in character_manager.DERIVED_STATS:
+        character_manager.add_base_stat(character, stat_name, value)
+        return
+
     character[stat_name] += value
 
     # Health cannot exceed max_health
@@ -232,10 +439,13 @@ def apply_stat_effect(character, stat_name, value):
         character['health'] = min(character['health'], character['max_health'])
 
 
-def display_inventory(character, item_data_dict):
+def display_inventory(character, item_data_dict=None):
     """
-    Pretty print inventory
+    Pretty print inventory (item_data_dict defaults to the registry)
     """
+    if item_data_dict is None:
+        item_data_dict = game_data.get_item_registry()
+
     if not character['inventory']:
         print("\nInventory is empty.\n")
         return
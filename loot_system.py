@@ -0,0 +1,149 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Loot System Module
+
+This module turns loot tables (see game_data.load_loot_tables) into
+alias-method samplers so each drop roll costs O(1).
+"""
+
+import random
+from custom_exceptions import InvalidTargetError
+
+# Item ID in a loot table that means "nothing dropped"
+NO_DROP = "NONE"
+
+# ============================================================================
+# ALIAS METHOD
+# ============================================================================
+
+def build_alias_table(weights):
+    """
+    Build Walker/Vose alias arrays for a list of non-negative weights
+
+    Returns (probabilities, aliases). Column i is kept with probability
+    probabilities[i], otherwise aliases[i] is used instead.
+    """
+    count = len(weights)
+    total = sum(weights)
+    if count == 0 or total <= 0:
+        raise ValueError("Alias table needs at least one positive weight")
+
+    scaled = [weight * count / total for weight in weights]
+    probabilities = [0.0] * count
+    aliases = list(range(count))
+
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+    while small and large:
+        low = small.pop()
+        high = large.pop()
+        probabilities[low] = scaled[low]
+        aliases[low] = high
+        scaled[high] = (scaled[high] + scaled[low]) - 1.0
+        if scaled[high] < 1.0:
+            small.append(high)
+        else:
+            large.append(high)
+
+    # Whatever is left over is full (up to rounding error)
+    for i in small + large:
+        probabilities[i] = 1.0
+
+    return probabilities, aliases
+
+
+def create_sampler(outcomes, weights):
+    """
+    Create an alias sampler dictionary for outcomes with the given weights
+    """
+    probabilities, aliases = build_alias_table(weights)
+    return {
+        "outcomes": list(outcomes),
+        "probabilities": probabilities,
+        "aliases": aliases
+    }
+
+
+def sample(sampler, rng=random):
+    """
+    Draw one outcome from a sampler using a single random number
+    """
+    outcomes = sampler["outcomes"]
+    scaled = rng.random() * len(outcomes)
+    column = int(scaled)
+    if scaled - column < sampler["probabilities"][column]:
+        return outcomes[column]
+    return outcomes[sampler["aliases"][column]]
+
+
+def sample_many(sampler, count, rng=random):
+    """
+    Draw count outcomes from a sampler in one call
+    """
+    outcomes = sampler["outcomes"]
+    probabilities = sampler["probabilities"]
+    aliases = sampler["aliases"]
+    size = len(outcomes)
+    draw = rng.random
+
+    results = []
+    append = results.append
+    for _ in range(count):
+        scaled = draw() * size
+        column = int(scaled)
+        if scaled - column < probabilities[column]:
+            append(outcomes[column])
+        else:
+            append(outcomes[aliases[column]])
+    return results
+
+# ============================================================================
+# LOOT TABLES
+# ============================================================================
+
+def build_loot_tables(loot_data_dict):
+    """
+    Convert loaded loot data into {enemy_type: sampler}
+    """
+    tables = {}
+    for enemy_type, loot in loot_data_dict.items():
+        item_ids = [item_id for item_id, _ in loot["drops"]]
+        weights = [weight for _, weight in loot["drops"]]
+        tables[enemy_type] = create_sampler(item_ids, weights)
+    return tables
+
+
+def roll_loot(loot_tables, enemy_type, rng=random):
+    """
+    Roll one drop for an enemy type; returns an item ID or None
+    """
+    if enemy_type not in loot_tables:
+        raise InvalidTargetError(f"No loot table for enemy: {enemy_type}")
+
+    item_id = sample(loot_tables[enemy_type], rng)
+    return None if item_id == NO_DROP else item_id
+
+
+def roll_loot_batch(loot_tables, enemy_type, count, rng=random):
+    """
+    Roll count drops for an enemy type; "no drop" results are None
+    """
+    if enemy_type not in loot_tables:
+        raise InvalidTargetError(f"No loot table for enemy: {enemy_type}")
+
+    drops = sample_many(loot_tables[enemy_type], count, rng)
+    return [None if item_id == NO_DROP else item_id for item_id in drops]
+
+
+def get_enemy_loot(enemy, loot_tables, rng=random):
+    """
+    Roll a drop for a defeated enemy dictionary (None if no table or no drop)
+
+    Tables are keyed by enemy_id; enemies without one (e.g. from an old
+    replay) fall back to their lowercased name.
+    """
+    enemy_type = enemy.get("enemy_id") or enemy["name"].lower()
+    if enemy_type not in loot_tables:
+        return None
+    return roll_loot(loot_tables, enemy_type, rng)
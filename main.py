@@ -40,6 +40,7 @@ from custom_exceptions import *
 current_character = None      # dict
 all_quests = {}               # dict
 all_items = {}                # dict
+shop_index = {}               # dict (see inventory_system.build_shop_index)
 game_running = False
 
 
@@ -77,6 +78,7 @@ def new_game():
 
     try:
         current_character = character_manager.create_character(name, char_class)
+        quest_handler.track_available_quests(current_character, all_quests)
         print(f"\nCharacter '{name}' the {char_class} created!")
         game_loop()
     except InvalidCharacterClassError as e:
@@ -111,6 +113,7 @@ def load_game():
     try:
         selected = saves[int(choice) - 1]
         current_character = character_manager.load_character(selected)
+        quest_handler.track_available_quests(current_character, all_quests)
         print(f"\nLoaded character '{current_character['name']}'!")
         game_loop()
 
@@ -273,33 +276,56 @@ def explore():
     global current_character
 
     print("\n=== EXPLORING... ===")
-    battle = combat_system.SimpleBattle(current_character)
+    enemy = combat_system.get_random_enemy_for_level(current_character['level'])
+    battle = combat_system.SimpleBattle(current_character, enemy)
     result = battle.start_battle()
 
-    if result == "loss":
+    if result["winner"] == "enemy":
         handle_character_death()
-    else:
-        print("You won the battle!")
+    elif result["winner"] == "player":
+        character_manager.gain_experience(current_character, result["xp_gained"])
+        character_manager.add_gold(current_character, result["gold_gained"])
+        for item_id in combat_system.get_victory_loot(enemy):
+            try:
+                inventory_system.add_item_to_inventory(current_character, item_id)
+                print(f"{enemy['name']} dropped: {item_id}")
+            except InventoryFullError:
+                print(f"{enemy['name']} dropped {item_id}, but your inventory is full.")
 
 
 def shop():
-    """Buy/sell items."""
-    global current_character, all_items
+    """Buy items, browsing the catalog one page at a time."""
+    global current_character, all_items, shop_index
 
     print("\n=== SHOP ===")
     print(f"You have {current_character['gold']} gold.")
 
-    for item_id, info in all_items.items():
-        print(f"- {item_id}: {info['price']} gold")
+    item_type = input("Browse which type (weapon/armor/consumable)? ").strip().lower()
+    page = 1
 
-    choice = input("Buy which item (or 'back')? ").strip()
-    if choice.lower() == "back":
-        return
+    while True:
+        results = inventory_system.get_affordable_items(
+            shop_index, item_type, current_character['gold'], page
+        )
+        if results["total_items"] == 0:
+            print("Nothing you can afford here.")
+            return
+
+        print(f"\n-- Page {results['page']} of {results['total_pages']} --")
+        for item_id in results["items"]:
+            print(f"- {item_id}: {all_items[item_id]['cost']} gold")
+
+        choice = input("Buy which item ('n' next page, 'back')? ").strip()
+        if choice.lower() == "back":
+            return
+        if choice.lower() == "n":
+            page = page + 1 if page < results["total_pages"] else 1
+            continue
+        break
 
     if choice in all_items:
-        price = all_items[choice]["price"]
         try:
-            inventory_system.buy_item(current_character, choice, price)
+            inventory_system.purchase_item(current_character, choice, all_items[choice])
             print(f"Bought {choice}!")
         except InventoryError as e:
             print(f"ERROR: {e}")
@@ -322,11 +348,17 @@ def save_game():
 
 
 def load_game_data():
-    """Load items and quests."""
-    global all_items, all_quests
-
-    all_quests = game_data.load_quest_data("data/quests.txt")
-    all_items = game_data.load_item_data("data/items.txt")
+    """Load items, quests, enemies and loot tables."""
+    global all_items, all_quests, shop_index
+
+    all_quests = game_data.load_quests("data/quests.txt")
+    quest_handler.build_quest_graph(all_quests)
+    all_items = game_data.load_items("data/items.txt")
+    game_data.register_item_catalog(all_items)
+    shop_index = inventory_system.build_shop_index(all_items)
+    combat_system.register_enemies(game_data.load_enemies("data/enemies.txt"))
+    combat_system.register_spawn_tables(game_data.load_spawn_tables("data/spawn_tables.txt"))
+    combat_system.register_loot_tables(game_data.load_loot_tables("data/loot_tables.txt"))
 
 
 def handle_character_death():
@@ -0,0 +1,197 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Party Battle Module
+
+This module fights a party of characters against a group of enemies.
+Turn order comes from an initiative heap keyed on each combatant's next
+action time (faster combatants act more often), and each side keeps a
+heap of its members by current health so "attack the weakest" is a
+heap peek. Dead combatants are dropped lazily when they surface at the
+top of a heap, so nothing ever scans the whole battlefield.
+"""
+
+import heapq
+import random
+from array import array
+
+import combat_system
+from custom_exceptions import CharacterDeadError, InvalidTargetError
+
+PARTY = 0
+ENEMIES = 1
+
+# Speed of a combatant without a "speed" key
+CLASS_SPEED = {"warrior": 8, "mage": 10, "rogue": 12, "cleric": 9}
+DEFAULT_SPEED = 10
+
+# Time units per action are INITIATIVE_SCALE // speed
+INITIATIVE_SCALE = 1200
+
+# Battles stop as a draw after this many actions
+MAX_PARTY_ACTIONS = 100000
+
+
+def get_speed(combatant):
+    """Speed of a character or enemy (higher acts more often)."""
+    if "speed" in combatant:
+        return combatant["speed"]
+    return CLASS_SPEED.get(combatant.get("class", "").lower(), DEFAULT_SPEED)
+
+
+class PartyBattle:
+    """
+    Party of characters against a group of enemies
+
+    Characters use their special ability whenever it is off cooldown
+    and use_abilities is True (clerics only heal below heal_below of max
+    health); otherwise they attack. Both sides target the living opponent with the lowest
+    health. The combatant dictionaries are updated in place, like
+    SimpleBattle does.
+    """
+
+    def __init__(self, party, enemies, rng=None, use_abilities=True, heal_below=0.5,
+                 max_actions=MAX_PARTY_ACTIONS):
+        if not party or not enemies:
+            raise InvalidTargetError("Both sides need at least one combatant")
+        for character in party:
+            if character["health"] <= 0:
+                raise CharacterDeadError(f"{character['name']} cannot start battle while dead.")
+
+        self.combatants = list(party) + list(enemies)
+        self.side = [PARTY] * len(party) + [ENEMIES] * len(enemies)
+        self.party_size = len(party)
+        self.members = [range(len(party)), range(len(party), len(self.combatants))]
+        self.rng = rng if rng is not None else random
+        self.use_abilities = use_abilities
+        self.heal_below = heal_below
+        self.max_actions = max_actions
+        self.actions = 0
+
+        # Ability cooldowns count each combatant's own turns
+        self.cooldowns = combat_system.CooldownTracker(len(self.combatants))
+        self.turns_taken = array("i", [0]) * len(self.combatants)
+        self.ability_cooldowns = [combat_system.get_ability_cooldown(c) for c in self.combatants]
+
+        self.alive = [c["health"] > 0 for c in self.combatants]
+        self.alive_count = [sum(self.alive[:len(party)]), sum(self.alive[len(party):])]
+        self.periods = [max(1, INITIATIVE_SCALE // get_speed(c)) for c in self.combatants]
+
+        # (next action time, index); index breaks ties in a fixed order
+        self.initiative = [(self.periods[i], i) for i in range(len(self.combatants)) if self.alive[i]]
+        heapq.heapify(self.initiative)
+
+        # Per side: (health, index) entries; stale ones are skipped on peek
+        self.health_heaps = [[], []]
+        for i, combatant in enumerate(self.combatants):
+            if self.alive[i]:
+                self.health_heaps[self.side[i]].append((combatant["health"], i))
+        for heap in self.health_heaps:
+            heapq.heapify(heap)
+
+    # ------------------------------------------------------------------
+    # Heaps
+    # ------------------------------------------------------------------
+
+    def weakest(self, side):
+        """Index of the living combatant on side with the lowest health."""
+        heap = self.health_heaps[side]
+        combatants = self.combatants
+        alive = self.alive
+        while heap:
+            health, index = heap[0]
+            if alive[index] and combatants[index]["health"] == health:
+                return index
+            heapq.heappop(heap)
+        return None
+
+    def _health_changed(self, index):
+        combatant = self.combatants[index]
+        if combatant["health"] <= 0:
+            combatant["health"] = 0
+            self.alive[index] = False
+            self.alive_count[self.side[index]] -= 1
+            return
+
+        side = self.side[index]
+        heap = self.health_heaps[side]
+        heapq.heappush(heap, (combatant["health"], index))
+        # Rebuild once stale entries outnumber live ones (amortized O(1))
+        if len(heap) > 4 * self.alive_count[side] + 16:
+            heap = [(self.combatants[i]["health"], i) for i in self.members[side] if self.alive[i]]
+            heapq.heapify(heap)
+            self.health_heaps[side] = heap
+
+    # ------------------------------------------------------------------
+    # Battle
+    # ------------------------------------------------------------------
+
+    def take_turn(self, index):
+        """One action by combatants[index]."""
+        actor = self.combatants[index]
+        opposing = ENEMIES if self.side[index] == PARTY else PARTY
+        target_index = self.weakest(opposing)
+        target = self.combatants[target_index]
+
+        turn = self.turns_taken[index] + 1
+        self.turns_taken[index] = turn
+
+        if self.side[index] == PARTY and self.use_abilities and self.cooldowns.is_ready(index, turn):
+            if actor["class"].lower() == "cleric":
+                if actor["health"] < actor["max_health"] * self.heal_below:
+                    combat_system.use_special_ability(actor, target, self.rng)
+                    self.cooldowns.trigger(index, turn, self.ability_cooldowns[index])
+                    self._health_changed(index)
+                    return
+            else:
+                combat_system.use_special_ability(actor, target, self.rng)
+                self.cooldowns.trigger(index, turn, self.ability_cooldowns[index])
+                self._health_changed(target_index)
+                return
+
+        damage = max(1, actor["strength"] - target["strength"] // 4)
+        target["health"] = max(0, target["health"] - damage)
+        self._health_changed(target_index)
+
+    def start_battle(self):
+        """Run the battle to the end and return a result record."""
+        initiative = self.initiative
+        alive = self.alive
+        alive_count = self.alive_count
+
+        while alive_count[PARTY] and alive_count[ENEMIES]:
+            if self.actions >= self.max_actions:
+                return self.build_result("draw")
+
+            time, index = heapq.heappop(initiative)
+            if not alive[index]:
+                continue  # dead combatants leave the schedule here
+
+            self.take_turn(index)
+            self.actions += 1
+            heapq.heappush(initiative, (time + self.periods[index], index))
+
+        return self.build_result("party" if alive_count[PARTY] else "enemies")
+
+    def build_result(self, winner):
+        enemies = self.combatants[self.party_size:]
+        xp = gold = 0
+        if winner == "party":
+            for enemy in enemies:
+                rewards = combat_system.get_victory_rewards(enemy)
+                xp += rewards["xp"]
+                gold += rewards["gold"]
+
+        return {
+            "winner": winner,
+            "actions": self.actions,
+            "survivors": [c["name"] for i, c in enumerate(self.combatants) if self.alive[i]],
+            "party_health": [c["health"] for c in self.combatants[:self.party_size]],
+            "enemy_health": [c["health"] for c in enemies],
+            "xp_gained": xp,
+            "gold_gained": gold
+        }
+
+
+def run_party_battle(party, enemies, rng=None, **options):
+    """Fight a party battle and return its result record."""
+    return PartyBattle(party, enemies, rng, **options).start_battle()
@@ -0,0 +1,220 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Quest Analytics Module
+
+This module answers roster-wide and catalog-wide questions about quests
+for live-ops and design tools, built on quest_handler's QuestGraph.
+"""
+
+import bisect
+import quest_handler
+
+# ============================================================================
+# ROSTER AVAILABILITY (BITSETS)
+# ============================================================================
+
+def _mask_from_indices(indices, size):
+    """Build an int bitmask with the given bit positions set."""
+    bits = bytearray((size + 7) // 8)
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, "little")
+
+
+class RosterQuestMatrix:
+    """
+    Quest availability for a whole roster, stored column-wise as bitsets
+
+    Bit i of every mask stands for characters[i]. Each quest has a
+    completed column and an active column, and each required level maps
+    to a "level high enough" mask. Availability of a quest for every
+    character is then a handful of big-int ANDs instead of one
+    can_accept_quest call per character.
+    """
+
+    def __init__(self, characters, quest_data_dict):
+        self.graph = quest_handler.get_quest_graph(quest_data_dict)
+        self.size = len(characters)
+        self.all_mask = (1 << self.size) - 1
+
+        completed = {}
+        active = {}
+        for index, character in enumerate(characters):
+            for q_id in character['completed_quests']:
+                completed.setdefault(q_id, []).append(index)
+            for q_id in character['active_quests']:
+                active.setdefault(q_id, []).append(index)
+
+        self.completed = {q_id: _mask_from_indices(rows, self.size) for q_id, rows in completed.items()}
+        self.active = {q_id: _mask_from_indices(rows, self.size) for q_id, rows in active.items()}
+
+        # Characters sorted by level, for "level >= L" masks
+        order = sorted(range(self.size), key=lambda i: characters[i]['level'])
+        self._sorted_rows = order
+        self._sorted_levels = [characters[i]['level'] for i in order]
+        self._level_masks = {}
+
+    def level_mask(self, level):
+        """Mask of characters whose level is at least level."""
+        if level not in self._level_masks:
+            start = bisect.bisect_left(self._sorted_levels, level)
+            self._level_masks[level] = _mask_from_indices(self._sorted_rows[start:], self.size)
+        return self._level_masks[level]
+
+    def prerequisite_mask(self, quest_id):
+        """Mask of characters who satisfy some prerequisite group of quest_id."""
+        groups = self.graph.prerequisite_groups[quest_id]
+        if not groups:
+            return self.all_mask
+
+        mask = 0
+        for group in groups:
+            group_mask = self.all_mask
+            for prereq in group:
+                group_mask &= self.completed.get(prereq, 0)
+            mask |= group_mask
+        return mask
+
+    def available_mask(self, quest_id, required_level=None):
+        """Mask of characters who can accept quest_id (optionally at another level gate)."""
+        if required_level is None:
+            required_level = self.graph.quests[quest_id].get('required_level', 0)
+        blocked = self.completed.get(quest_id, 0) | self.active.get(quest_id, 0)
+        return self.level_mask(required_level) & self.prerequisite_mask(quest_id) & ~blocked
+
+    def count_available(self, quest_id):
+        """Number of characters who can currently accept quest_id."""
+        return self.available_mask(quest_id).bit_count()
+
+    def characters_available(self, quest_id):
+        """Roster indices of characters who can currently accept quest_id."""
+        mask = self.available_mask(quest_id)
+        rows = []
+        while mask:
+            low = mask & -mask
+            rows.append(low.bit_length() - 1)
+            mask ^= low
+        return rows
+
+    def available_counts(self):
+        """Return {quest_id: number of characters who can accept it}."""
+        return {q_id: self.count_available(q_id) for q_id in self.graph.quests}
+
+    def level_gate_gain(self, quest_id, new_level):
+        """How many more characters could accept quest_id at new_level."""
+        now = self.available_mask(quest_id)
+        lowered = self.available_mask(quest_id, new_level)
+        return (lowered & ~now).bit_count()
+
+    def best_level_gate_changes(self, levels_lowered=1, top=10):
+        """
+        Rank quests by how many characters lowering their gate would unlock
+
+        Returns up to top (quest_id, extra_characters) pairs, best first.
+        """
+        gains = []
+        for q_id, quest in self.graph.quests.items():
+            new_level = quest.get('required_level', 0) - levels_lowered
+            gain = self.level_gate_gain(q_id, new_level)
+            if gain > 0:
+                gains.append((q_id, gain))
+        gains.sort(key=lambda pair: (-pair[1], self.graph.position[pair[0]]))
+        return gains[:top]
+
+# ============================================================================
+# PREREQUISITE DAG ANALYSIS
+# ============================================================================
+
+# Every function below is one pass over QuestGraph.topological_order, so a
+# quest is processed after its prerequisites (after one complete group for
+# quests on an OR loop): O(quests + prerequisites).
+
+def find_unreachable_quests(quest_data_dict):
+    """
+    Return the set of quests that can never be unlocked from NONE roots
+
+    A quest is unreachable if every one of its prerequisite groups
+    contains a quest that is missing from the catalog or unreachable.
+    """
+    graph = quest_handler.get_quest_graph(quest_data_dict)
+    reachable = set()
+    for q_id in graph.topological_order:
+        groups = graph.prerequisite_groups[q_id]
+        if not groups or any(all(p in reachable for p in group) for group in groups):
+            reachable.add(q_id)
+    return set(graph.quests) - reachable
+
+
+def get_minimum_levels(quest_data_dict):
+    """
+    Return {quest_id: lowest character level at which it can be reached}
+
+    That is the quest's required_level or, if higher, the cheapest
+    prerequisite group's highest minimum level. Unreachable quests are
+    left out.
+    """
+    graph = quest_handler.get_quest_graph(quest_data_dict)
+    min_levels = {}
+    for q_id in graph.topological_order:
+        level = graph.quests[q_id].get('required_level', 0)
+        groups = graph.prerequisite_groups[q_id]
+        if not groups:
+            min_levels[q_id] = level
+            continue
+
+        best_group = None
+        for group in groups:
+            if all(p in min_levels for p in group):
+                group_level = max(min_levels[p] for p in group)
+                if best_group is None or group_level < best_group:
+                    best_group = group_level
+        if best_group is not None:
+            min_levels[q_id] = max(level, best_group)
+    return min_levels
+
+
+def find_best_reward_path(quest_data_dict, reward_key='reward_xp'):
+    """
+    Return (total, path) for the prerequisite path with the most reward
+
+    reward_key is 'reward_xp' or 'reward_gold'; path lists quest IDs
+    root first, following one reachable prerequisite at each step.
+    """
+    graph = quest_handler.get_quest_graph(quest_data_dict)
+    return _longest_path(graph, lambda quest: quest.get(reward_key, 0))
+
+
+def find_longest_chain(quest_data_dict):
+    """Return the longest prerequisite chain as a list of quest IDs."""
+    graph = quest_handler.get_quest_graph(quest_data_dict)
+    return _longest_path(graph, lambda quest: 1)[1]
+
+
+def _longest_path(graph, weight):
+    """Weighted longest path over reachable quests (DP in topological order)."""
+    unreachable = find_unreachable_quests(graph.quests)
+    best = {}
+    parent = {}
+    for q_id in graph.topological_order:
+        if q_id in unreachable:
+            continue
+
+        best_prereq = None
+        for prereq in graph.prerequisites[q_id]:
+            if prereq in best and (best_prereq is None or best[prereq] > best[best_prereq]):
+                best_prereq = prereq
+
+        best[q_id] = weight(graph.quests[q_id]) + (best[best_prereq] if best_prereq else 0)
+        parent[q_id] = best_prereq
+
+    if not best:
+        return 0, []
+
+    end = max(best, key=best.__getitem__)
+    path = []
+    current = end
+    while current is not None:
+        path.append(current)
+        current = parent[current]
+    path.reverse()
+    return best[end], path
@@ -9,14 +9,85 @@ AI Usage: [Document any AI assistance used]
 This module handles quest management, dependencies, and completion.
 """
 
+import bisect
+import weakref
+import zlib
+import game_data
 from custom_exceptions import (
     QuestNotFoundError,
     QuestRequirementsNotMetError,
     QuestAlreadyCompletedError,
     QuestNotActiveError,
-    InsufficientLevelError
+    InsufficientLevelError,
+    InvalidDataFormatError
 )
 
+# Built quest graphs by catalog: {id(catalog): (catalog, version, graph)}.
+# Entries built before the last invalidate_quest_graphs() are rebuilt.
+_graph_cache = {}
+_graph_version = 0
+GRAPH_CACHE_SIZE = 8
+
+
+class QuestSet:
+    """
+    Insertion-ordered set of quest IDs with O(1) membership
+
+    Used for character['active_quests'] and ['completed_quests']. It
+    supports the list operations the game relies on (in, append, remove,
+    len, iteration) and saves exactly like a list of IDs.
+    """
+
+    def __init__(self, quest_ids=()):
+        self._ids = dict.fromkeys(quest_ids)
+        # Bumped on every change so cached completed-quest masks can tell
+        self.changes = 0
+
+    def __contains__(self, quest_id):
+        return quest_id in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __eq__(self, other):
+        if isinstance(other, QuestSet):
+            return list(self._ids) == list(other._ids)
+        if isinstance(other, list):
+            return list(self._ids) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"QuestSet({list(self._ids)!r})"
+
+    def append(self, quest_id):
+        """Add a quest ID at the end (no-op if already present)."""
+        if quest_id not in self._ids:
+            self._ids[quest_id] = None
+            self.changes += 1
+
+    def remove(self, quest_id):
+        """Remove a quest ID, raising ValueError like list.remove."""
+        if quest_id not in self._ids:
+            raise ValueError(f"{quest_id!r} not in quest set")
+        del self._ids[quest_id]
+        self.changes += 1
+
+    def discard(self, quest_id):
+        """Remove a quest ID if present."""
+        if quest_id in self._ids:
+            del self._ids[quest_id]
+            self.changes += 1
+
+    def clear(self):
+        self._ids.clear()
+        self.changes += 1
+
+    def copy(self):
+        return QuestSet(self._ids)
+
 
 def accept_quest(character, quest_id, quest_data_dict):
     """Accept a new quest."""
@@ -29,9 +100,9 @@ def accept_quest(character, quest_id, quest_data_dict):
     if character['level'] < quest['required_level']:
         raise InsufficientLevelError("Character does not meet level requirement.")
 
-    # Prerequisite check
-    prereq = quest['prerequisite']
-    if prereq != "NONE" and prereq not in character['completed_quests']:
+    # Prerequisite check (bitmask AND against completed quests)
+    graph = _graph_for_quest(quest_data_dict, quest_id)
+    if not graph.requirements_met(quest_id, graph.get_completed_mask(character)):
         raise QuestRequirementsNotMetError("Prerequisite quest not completed.")
 
     # Already completed?
@@ -43,6 +114,10 @@ def accept_quest(character, quest_id, quest_data_dict):
         raise QuestRequirementsNotMetError("Quest already active.")
 
     character['active_quests'].append(quest_id)
+
+    tracker = _get_tracker(character)
+    if tracker is not None:
+        tracker["available"].pop(quest_id, None)
     return True
 
 
@@ -55,10 +130,14 @@ def complete_quest(character, quest_id, quest_data_dict):
         raise QuestNotActiveError("Quest is not currently active.")
 
     quest = quest_data_dict[quest_id]
+    graph = _graph_for_quest(quest_data_dict, quest_id)
+    totals_current = _reward_totals_current(character, graph)
+    completed_mask = graph.get_completed_mask(character)
 
     # Remove from active, add to completed
     character['active_quests'].remove(quest_id)
     character['completed_quests'].append(quest_id)
+    graph.record_completion(character, quest_id, completed_mask)
 
     # Grant rewards
     xp = quest['reward_xp']
@@ -67,6 +146,17 @@ def complete_quest(character, quest_id, quest_data_dict):
     character['experience'] += xp
     character['gold'] += gold
 
+    # Keep running totals current (otherwise they are rebuilt when read)
+    if totals_current:
+        character['quest_xp_earned'] += xp
+        character['quest_gold_earned'] += gold
+        character['quest_totals_count'] = len(character['completed_quests'])
+
+    # Completing a quest can only unlock its direct dependents
+    tracker = _get_tracker(character)
+    if tracker is not None:
+        _offer_quests(character, tracker, tracker["graph"].dependents.get(quest_id, ()))
+
     return {
         "quest_id": quest_id,
         "earned_xp": xp,
@@ -80,6 +170,10 @@ def abandon_quest(character, quest_id):
         raise QuestNotActiveError("Quest is not active and cannot be abandoned.")
 
     character['active_quests'].remove(quest_id)
+
+    tracker = _get_tracker(character)
+    if tracker is not None:
+        _offer_quests(character, tracker, [quest_id])
     return True
 
 
@@ -103,11 +197,12 @@ def get_completed_quests(character, quest_data_dict):
 
 def get_available_quests(character, quest_data_dict):
     """Return quests the character can currently accept."""
-    available = []
-    for q_id, quest in quest_data_dict.items():
-        if can_accept_quest(character, q_id, quest_data_dict):
-            available.append(quest)
-    return available
+    if '_quest_tracker' in character:
+        tracker = track_available_quests(character, quest_data_dict)
+        return [quest_data_dict[q_id] for q_id in tracker["available"]]
+
+    graph = get_quest_graph(quest_data_dict)
+    return [quest_data_dict[q_id] for q_id in graph.get_available_ids(character)]
 
 # ============================================================================
 # QUEST TRACKING
@@ -140,12 +235,9 @@ def can_accept_quest(character, quest_id, quest_data_dict):
     if character['level'] < quest['required_level']:
         return False
 
-    # Prerequisite
-    prereq = quest['prerequisite']
-    if prereq != "NONE" and prereq not in character['completed_quests']:
-        return False
-
-    return True
+    # Prerequisites
+    graph = _graph_for_quest(quest_data_dict, quest_id)
+    return graph.requirements_met(quest_id, graph.get_completed_mask(character))
 
 
 def get_quest_prerequisite_chain(quest_id, quest_data_dict):
@@ -153,22 +245,454 @@ def get_quest_prerequisite_chain(quest_id, quest_data_dict):
     if quest_id not in quest_data_dict:
         raise QuestNotFoundError(f"Quest '{quest_id}' not found.")
 
-    chain = []
-    current = quest_id
+    return get_quest_graph(quest_data_dict).get_chain(quest_id)
+
+# ============================================================================
+# QUEST GRAPH
+# ============================================================================
+
+class QuestGraph:
+    """
+    Prerequisite index over a quest catalog, built once at load time
+
+    - dependents: prerequisite ID -> quests that require it
+    - topological_order: every quest after its prerequisites
+    - level_buckets: required_level -> quest IDs
+    - level_sorted_ids / level_sorted_levels: quests sorted by level for
+      bisect range queries
+    - dense_ids / requirement_bits: every quest ID (and unknown
+      prerequisite ID) gets a bit position, and each quest keeps the bit
+      positions of every OR-group of prerequisites, so requirement checks
+      are bit tests against the completed-quest mask
+    Availability only looks at root quests the character's level allows
+    and at direct dependents of completed quests.
+
+    A quest on an OR loop that one of its other groups can unlock is
+    still ordered. Quests that a prerequisite cycle really blocks are
+    left out of topological_order and listed in blocked (the cycles in
+    cycles); with strict=True they raise InvalidDataFormatError instead.
+    """
+
+    def __init__(self, quest_data_dict, strict=False):
+        self.quests = quest_data_dict
+        self.size = len(quest_data_dict)
+        self.position = {}
+        self.prerequisite_groups = {}
+        self.prerequisites = {}
+        self.dependents = {}
+        self.level_buckets = {}
+        roots = []
+
+        for index, (q_id, quest) in enumerate(quest_data_dict.items()):
+            self.position[q_id] = index
+            level = quest.get('required_level', 0)
+            self.level_buckets.setdefault(level, []).append(q_id)
+
+            # A copy, so in-place edits to the quest can be detected
+            self.prerequisite_groups[q_id] = _copy_groups(get_prerequisite_groups(quest))
+            prereqs = get_quest_prerequisites(quest)
+            self.prerequisites[q_id] = prereqs
+            if not prereqs:
+                roots.append((level, index, q_id))
+            for prereq in prereqs:
+                self.dependents.setdefault(prereq, []).append(q_id)
+
+        # Dense bit positions: catalog quests first, then unknown prerequisites
+        self.dense_ids = dict(self.position)
+        for prereq in self.dependents:
+            if prereq not in self.dense_ids:
+                self.dense_ids[prereq] = len(self.dense_ids)
+
+        # Bit positions, not masks: a mask is as wide as its highest bit
+        dense_ids = self.dense_ids
+        self.requirement_bits = {}
+        for q_id, groups in self.prerequisite_groups.items():
+            self.requirement_bits[q_id] = [
+                tuple(dense_ids[prereq] for prereq in group) for group in groups
+            ]
+
+        self.level_sorted_ids = []
+        self.level_sorted_levels = []
+        for level in sorted(self.level_buckets):
+            bucket = self.level_buckets[level]
+            self.level_sorted_ids.extend(bucket)
+            self.level_sorted_levels.extend([level] * len(bucket))
+
+        # Roots sorted by level so a character only visits the ones it can take
+        roots.sort()
+        self.root_levels = [level for level, _, _ in roots]
+        self.root_ids = [q_id for _, _, q_id in roots]
+
+        self.topological_order, loose, self.cycles = _order_prerequisites(self.prerequisite_groups)
+        if self.cycles and strict:
+            raise InvalidDataFormatError(
+                "Quest prerequisites contain a cycle among: "
+                + "; ".join(", ".join(sorted(cycle)) for cycle in self.cycles)
+            )
+        self.blocked = set(quest_data_dict).difference(self.topological_order)
+
+        # Chains are only defined for quests whose prerequisites never loop
+        self.chain_safe = set()
+        for q_id in self.topological_order:
+            if q_id not in loose and all(p in self.chain_safe or p not in quest_data_dict
+                                         for p in self.prerequisites[q_id]):
+                self.chain_safe.add(q_id)
+
+        self.topological_index = {q_id: i for i, q_id in enumerate(self.topological_order)}
+        # Chain links by quest: (previous, extras, depth), see PrerequisiteChains
+        self._links = {}
+
+        # Completed-quest masks by id(QuestSet): (weakref, changes, mask)
+        self._masks = {}
+
+        # Changes whenever any quest's rewards change (stable across runs)
+        rewards = "\n".join(
+            f"{q_id}:{quest.get('reward_xp', 0)}:{quest.get('reward_gold', 0)}"
+            for q_id, quest in quest_data_dict.items()
+        )
+        self.reward_signature = zlib.crc32(rewards.encode("utf-8"))
+
+    def get_chain(self, q_id):
+        """
+        Return the prerequisite chain of a quest (root first) as a list.
+
+        A chain holds every quest referenced (directly or indirectly) as a
+        prerequisite, in topological order, followed by the quest itself.
+        Only a link to the chain it extends is memoized per quest (see
+        PrerequisiteChains), so shared prefixes are stored once and a
+        chain is built in O(depth). Raises InvalidDataFormatError if the
+        quest's prerequisites loop.
+        """
+        if q_id in self.quests and q_id not in self.chain_safe:
+            raise InvalidDataFormatError(f"Prerequisite chain of quest '{q_id}' contains a cycle.")
+        stack = [q_id]
+        while stack:
+            current = stack[-1]
+            if current in self._links:
+                stack.pop()
+                continue
+            if current not in self.quests:
+                raise QuestNotFoundError(f"Quest '{current}' not found.")
+
+            pending = [p for p in self.prerequisites[current] if p not in self._links]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            stack.pop()
+            self._links[current] = self._build_link(current)
+        return _expand_chain(self._links, q_id)
+
+    def get_all_chains(self):
+        """
+        Resolve the chain of every quest in one topological pass.
+
+        Returns a PrerequisiteChains mapping, which stores one link per
+        quest instead of one list per quest. Quests whose chain reaches a
+        missing prerequisite or a cycle are left out.
+        """
+        for q_id in self.topological_order:
+            if q_id in self._links:
+                continue
+            if all(prereq in self._links for prereq in self.prerequisites[q_id]):
+                self._links[q_id] = self._build_link(q_id)
+        return PrerequisiteChains(dict(self._links))
+
+    def _build_link(self, q_id):
+        """
+        (previous, extras, depth) for q_id from its prerequisites' links
+
+        The chain extends the deepest prerequisite's chain; quests from
+        the other prerequisites' chains that it lacks become extras.
+        """
+        prereqs = self.prerequisites[q_id]
+        if not prereqs:
+            return None, (), 1
+        links = self._links
+        previous = max(prereqs, key=lambda prereq: links[prereq][2])
+        if len(prereqs) == 1:
+            return previous, (), links[previous][2] + 1
+
+        steps = set(_expand_chain(links, previous))
+        extras = set()
+        for prereq in prereqs:
+            if prereq not in steps:
+                extras.update(step for step in _expand_chain(links, prereq) if step not in steps)
+        extras = tuple(sorted(extras, key=self.topological_index.__getitem__))
+        return previous, extras, links[previous][2] + len(extras) + 1
+
+    def get_level_range(self, min_level, max_level):
+        """Return the (start, end) slice of level_sorted_ids for a level band."""
+        lo = bisect.bisect_left(self.level_sorted_levels, min_level)
+        hi = bisect.bisect_right(self.level_sorted_levels, max_level)
+        return lo, max(lo, hi)
+
+    def get_completed_mask(self, character):
+        """
+        Bitmask of the character's completed quests
+
+        Masks of QuestSets are cached on the graph until the set changes;
+        plain lists are rebuilt on every call.
+        """
+        completed = character['completed_quests']
+        if isinstance(completed, QuestSet):
+            cached = self._masks.get(id(completed))
+            if cached is not None and cached[0]() is completed and cached[1] == completed.changes:
+                return cached[2]
+
+        mask = 0
+        for q_id in completed:
+            dense = self.dense_ids.get(q_id)
+            if dense is not None:
+                mask |= 1 << dense
+        self._cache_mask(completed, mask)
+        return mask
+
+    def record_completion(self, character, q_id, previous_mask):
+        """Update the cached mask after q_id was appended to completed_quests."""
+        self._cache_mask(character['completed_quests'], previous_mask | (1 << self.dense_ids[q_id]))
+
+    def _cache_mask(self, completed, mask):
+        if not isinstance(completed, QuestSet):
+            return
+        key = id(completed)
+        masks = self._masks
+        ref = weakref.ref(completed, lambda _, key=key: masks.pop(key, None))
+        masks[key] = (ref, completed.changes, mask)
+
+    def requirements_met(self, q_id, completed_mask):
+        """True if any prerequisite group is fully inside completed_mask."""
+        groups = self.requirement_bits[q_id]
+        if not groups:
+            return True
+        for bits in groups:
+            for bit in bits:
+                if not (completed_mask >> bit) & 1:
+                    break
+            else:
+                return True
+        return False
+
+    def is_unlocked(self, q_id, character, completed_mask):
+        """Level and prerequisite check against a completed-quest bitmask."""
+        quest = self.quests[q_id]
+        if character['level'] < quest.get('required_level', 0):
+            return False
+        return self.requirements_met(q_id, completed_mask)
+
+    def get_available_ids(self, character):
+        """Return IDs of quests the character can accept, in catalog order."""
+        completed = character['completed_quests']
+        if not isinstance(completed, QuestSet):
+            completed = set(completed)
+        active = character['active_quests']
+        if not isinstance(active, QuestSet):
+            active = set(active)
+
+        completed_mask = self.get_completed_mask(character)
+
+        cutoff = bisect.bisect_right(self.root_levels, character['level'])
+        candidates = self.root_ids[:cutoff]
+        for done in completed:
+            candidates.extend(self.dependents.get(done, ()))
+
+        available = set()
+        for q_id in candidates:
+            if q_id in completed or q_id in active or q_id in available:
+                continue
+            if self.is_unlocked(q_id, character, completed_mask):
+                available.add(q_id)
+
+        return sorted(available, key=self.position.__getitem__)
+
+
+def build_quest_graph(quest_data_dict, strict=True):
+    """
+    Build the quest graph for a catalog (call again after a reload)
+
+    Meant for load time: by default a prerequisite cycle raises
+    InvalidDataFormatError. Graphs built on demand by get_quest_graph
+    are not strict, so a bad quest never breaks unrelated ones.
+    """
+    graph = QuestGraph(quest_data_dict, strict)
+    _graph_cache.pop(id(quest_data_dict), None)
+    if len(_graph_cache) >= GRAPH_CACHE_SIZE:
+        del _graph_cache[next(iter(_graph_cache))]
+    _graph_cache[id(quest_data_dict)] = (quest_data_dict, _graph_version, graph)
+    return graph
+
+
+def get_quest_graph(quest_data_dict):
+    """
+    Return the cached graph for this catalog, building it if needed
+
+    Graphs for the last few catalogs are kept, so switching between
+    catalogs does not rebuild them. After editing a catalog in place
+    (prerequisites, levels or rewards), call invalidate_quest_graphs();
+    accept/complete/can_accept_quest notice edits to their own quest.
+    """
+    cached = _graph_cache.get(id(quest_data_dict))
+    if (cached is None or cached[0] is not quest_data_dict or cached[1] != _graph_version
+            or cached[2].size != len(quest_data_dict)):
+        return build_quest_graph(quest_data_dict, strict=False)
+    return cached[2]
+
+
+def _graph_for_quest(quest_data_dict, quest_id):
+    """Cached graph, rebuilt if quest_id is new to it or its prerequisites changed."""
+    graph = get_quest_graph(quest_data_dict)
+    groups = graph.prerequisite_groups.get(quest_id)
+    if groups is None or groups != _copy_groups(get_prerequisite_groups(quest_data_dict[quest_id])):
+        graph = build_quest_graph(quest_data_dict, strict=False)
+    return graph
+
+
+def invalidate_quest_graphs():
+    """Drop every cached quest graph; returns the new graph version."""
+    global _graph_version
+    _graph_version += 1
+    _graph_cache.clear()
+    return _graph_version
+
+
+def get_quest_graph_version():
+    """Return the version number of the quest graph cache"""
+    return _graph_version
+
+
+def get_all_prerequisite_chains(quest_data_dict):
+    """
+    Return the chains of the whole catalog (quest-log UI)
+
+    The result maps quest_id -> chain list, but builds each list only
+    when it is looked up (see PrerequisiteChains).
+    """
+    return get_quest_graph(quest_data_dict).get_all_chains()
+
+
+class PrerequisiteChains:
+    """
+    Prerequisite chains of many quests, sharing their common prefixes
+
+    links maps each quest to (previous, extras, depth): its chain is the
+    chain of previous (nothing for a root), then extras, then the quest
+    itself, and depth is the chain's length. Storage is O(quests) and
+    chains[q_id] builds one chain list in O(depth).
+    """
+
+    def __init__(self, links):
+        self.links = links
+
+    def __getitem__(self, q_id):
+        if q_id not in self.links:
+            raise KeyError(q_id)
+        return _expand_chain(self.links, q_id)
+
+    def __contains__(self, q_id):
+        return q_id in self.links
+
+    def __iter__(self):
+        return iter(self.links)
+
+    def __len__(self):
+        return len(self.links)
+
+    def get(self, q_id, default=None):
+        return self[q_id] if q_id in self.links else default
 
-    while True:
-        if current not in quest_data_dict:
-            raise QuestNotFoundError(f"Quest '{current}' not found.")
+    def depth(self, q_id):
+        """Length of a quest's chain without building it."""
+        return self.links[q_id][2]
+
+    def previous(self, q_id):
+        """Quest whose chain this quest's chain extends (None for roots)."""
+        return self.links[q_id][0]
 
-        chain.insert(0, current)
-        prereq = quest_data_dict[current]['prerequisite']
 
-        if prereq == "NONE":
-            break
+def _expand_chain(links, q_id):
+    """Follow chain links back from q_id and return the chain, root first."""
+    reversed_chain = []
+    current = q_id
+    while current is not None:
+        previous, extras, _ = links[current]
+        reversed_chain.append(current)
+        reversed_chain.extend(reversed(extras))
+        current = previous
+    reversed_chain.reverse()
+    return reversed_chain
 
-        current = prereq
 
-    return chain
+def get_prerequisite_groups(quest):
+    """Return OR-groups of AND-ed prerequisite IDs ([] for NONE)."""
+    if 'prerequisite_groups' in quest:
+        return quest['prerequisite_groups']
+    return game_data.parse_prerequisites(quest.get('prerequisite', "NONE"))
+
+
+def _copy_groups(groups):
+    """Prerequisite groups as a fresh list of lists (for comparisons)."""
+    return [list(group) for group in groups]
+
+
+def get_quest_prerequisites(quest):
+    """Return every quest ID referenced as a prerequisite (empty for NONE)."""
+    referenced = []
+    for group in get_prerequisite_groups(quest):
+        for prereq in group:
+            if prereq not in referenced:
+                referenced.append(prereq)
+    return referenced
+
+# ============================================================================
+# LIVE AVAILABLE-QUEST SETS
+# ============================================================================
+
+# A tracked character keeps character['_quest_tracker'] =
+#   {"graph": QuestGraph, "available": {quest_id: None, ...}}
+# which accept/complete/abandon_quest and level-ups keep up to date.
+# Changes made by editing the quest lists directly are not seen.
+
+def track_available_quests(character, quest_data_dict):
+    """Start (or refresh after a catalog reload) the live available set."""
+    graph = get_quest_graph(quest_data_dict)
+    tracker = character.get('_quest_tracker')
+    if tracker is None or tracker["graph"] is not graph:
+        tracker = {
+            "graph": graph,
+            "available": dict.fromkeys(graph.get_available_ids(character))
+        }
+        character['_quest_tracker'] = tracker
+    return tracker
+
+
+def update_available_quests_for_level(character, old_level):
+    """Add quests from the level buckets a character just reached."""
+    tracker = _get_tracker(character)
+    if tracker is None:
+        return
+
+    buckets = tracker["graph"].level_buckets
+    for level in range(old_level + 1, character['level'] + 1):
+        _offer_quests(character, tracker, buckets.get(level, ()))
+
+
+def _get_tracker(character):
+    """Return the character's tracker, or None if not tracked."""
+    return character.get('_quest_tracker')
+
+
+def _offer_quests(character, tracker, quest_ids):
+    """Add each quest that is now acceptable to the available set."""
+    graph = tracker["graph"]
+    available = tracker["available"]
+    completed = character['completed_quests']
+    active = character['active_quests']
+    completed_mask = graph.get_completed_mask(character)
+    for q_id in quest_ids:
+        if q_id not in graph.quests or q_id in completed or q_id in active:
+            continue
+        if graph.is_unlocked(q_id, character, completed_mask):
+            available[q_id] = None
 
 # ============================================================================
 # QUEST STATISTICS
@@ -187,29 +711,60 @@ def get_quest_completion_percentage(character, quest_data_dict):
 
 def get_total_quest_rewards_earned(character, quest_data_dict):
     """Return total XP and gold earned from completed quests."""
+    graph = get_quest_graph(quest_data_dict)
+    if not _reward_totals_current(character, graph):
+        _rebuild_reward_totals(character, graph)
+
+    return {
+        "total_xp": character['quest_xp_earned'],
+        "total_gold": character['quest_gold_earned']
+    }
+
+
+# Running totals are saved with the character as quest_xp_earned,
+# quest_gold_earned, quest_totals_count (completed quests counted) and
+# quest_totals_signature (the catalog's reward signature). They are
+# rebuilt once if either stamp no longer matches.
+
+def _reward_totals_current(character, graph):
+    """True if the saved running totals match this catalog and quest list."""
+    return (character.get('quest_totals_signature') == graph.reward_signature
+            and character.get('quest_totals_count') == len(character['completed_quests']))
+
+
+def _rebuild_reward_totals(character, graph):
+    """Recompute running totals from the completed quest list."""
     total_xp = 0
     total_gold = 0
-
     for q_id in character['completed_quests']:
-        if q_id in quest_data_dict:
-            quest = quest_data_dict[q_id]
+        if q_id in graph.quests:
+            quest = graph.quests[q_id]
             total_xp += quest['reward_xp']
             total_gold += quest['reward_gold']
 
-    return {
-        "total_xp": total_xp,
-        "total_gold": total_gold
-    }
+    character['quest_xp_earned'] = total_xp
+    character['quest_gold_earned'] = total_gold
+    character['quest_totals_count'] = len(character['completed_quests'])
+    character['quest_totals_signature'] = graph.reward_signature
 
 
 def get_quests_by_level(quest_data_dict, min_level, max_level):
     """Return quests whose required_level is in [min_level, max_level]."""
-    results = []
-    for quest in quest_data_dict.values():
-        lvl = quest['required_level']
-        if min_level <= lvl <= max_level:
-            results.append(quest)
-    return results
+    return list(iter_quests_by_level(quest_data_dict, min_level, max_level))
+
+
+def iter_quests_by_level(quest_data_dict, min_level, max_level):
+    """Yield quests in [min_level, max_level], lowest level first."""
+    graph = get_quest_graph(quest_data_dict)
+    lo, hi = graph.get_level_range(min_level, max_level)
+    for index in range(lo, hi):
+        yield quest_data_dict[graph.level_sorted_ids[index]]
+
+
+def count_quests_by_level(quest_data_dict, min_level, max_level):
+    """Return how many quests are in [min_level, max_level]."""
+    lo, hi = get_quest_graph(quest_data_dict).get_level_range(min_level, max_level)
+    return hi - lo
 
 # ============================================================================
 # DISPLAY FUNCTIONS
@@ -249,10 +804,227 @@ def display_character_quest_progress(character, quest_data_dict):
 # VALIDATION
 # ============================================================================
 
-def validate_quest_prerequisites(quest_data_dict):
-    """Ensure all prerequisites refer to real quests."""
+def validate_quest_prerequisites(quest_data_dict, report=False):
+    """
+    Ensure all prerequisites refer to real quests.
+
+    With report=True the whole graph is checked instead and the
+    structured report from validate_quest_graph is returned.
+    """
+    if report:
+        return validate_quest_graph(quest_data_dict)
+
     for q_id, quest in quest_data_dict.items():
-        prereq = quest['prerequisite']
-        if prereq != "NONE" and prereq not in quest_data_dict:
-            raise QuestNotFoundError(f"Prerequisite '{prereq}' for quest '{q_id}' not found.")
+        for prereq in get_quest_prerequisites(quest):
+            if prereq not in quest_data_dict:
+                raise QuestNotFoundError(f"Prerequisite '{prereq}' for quest '{q_id}' not found.")
     return True
+
+
+def validate_quest_graph(quest_data_dict):
+    """
+    Check the whole prerequisite graph in O(quests + prerequisites).
+
+    Returns a report dictionary:
+      valid                 - True if every list below is empty
+      missing_prerequisites - (quest_id, prerequisite_id) pairs
+      cycles                - lists of quest IDs forming a cycle that
+                              no OR-group gets around (as in QuestGraph)
+      unreachable           - quests no character can ever unlock
+      level_inversions      - (quest_id, prerequisite_id, quest_level,
+                               prerequisite_level) where the prerequisite
+                               needs a higher level than the quest
+    """
+    missing = []
+    inversions = []
+
+    # Every prerequisite group gets an integer ID:
+    #   group_owner[g]     - quest the group belongs to
+    #   group_remaining[g] - distinct members not yet unlocked
+    #   waiting[prereq]    - groups that list prereq
+    group_owner = []
+    group_remaining = []
+    waiting = {}
+    all_groups = {}
+    roots = []
+
+    for q_id, quest in quest_data_dict.items():
+        groups = get_prerequisite_groups(quest)
+        all_groups[q_id] = groups
+        if not groups:
+            roots.append(q_id)
+            continue
+
+        level = quest.get('required_level', 0)
+        for group in groups:
+            members = group if len(group) == 1 else list(dict.fromkeys(group))
+            group_id = len(group_owner)
+            group_owner.append(q_id)
+            group_remaining.append(len(members))
+            for prereq in members:
+                prereq_quest = quest_data_dict.get(prereq)
+                if prereq_quest is None:
+                    missing.append((q_id, prereq))
+                    continue
+                prereq_level = prereq_quest.get('required_level', 0)
+                if prereq_level > level:
+                    inversions.append((q_id, prereq, level, prereq_level))
+                if prereq in waiting:
+                    waiting[prereq].append(group_id)
+                else:
+                    waiting[prereq] = [group_id]
+
+    # Reachability: a quest unlocks once any of its groups is complete
+    reachable = set(roots)
+    ready = list(roots)
+    while ready:
+        for group_id in waiting.get(ready.pop(), ()):
+            group_remaining[group_id] -= 1
+            if group_remaining[group_id] == 0:
+                owner = group_owner[group_id]
+                if owner not in reachable:
+                    reachable.add(owner)
+                    ready.append(owner)
+
+    # Same cycle rule as QuestGraph: only loops no OR-group can get around
+    cycles = _order_prerequisites(all_groups)[2]
+
+    unreachable = [q_id for q_id in quest_data_dict if q_id not in reachable]
+
+    return {
+        "valid": not (missing or cycles or unreachable or inversions),
+        "missing_prerequisites": missing,
+        "cycles": cycles,
+        "unreachable": unreachable,
+        "level_inversions": inversions
+    }
+
+
+def _order_prerequisites(prerequisite_groups):
+    """
+    Order quests so that prerequisites come first
+
+    prerequisite_groups maps each catalog quest to its OR-groups;
+    prerequisites outside the catalog are ignored. A quest normally
+    follows all of its prerequisites. When that gets stuck on a loop, a
+    quest with one complete group is placed anyway (an OR loop it can be
+    unlocked around). Returns (order, loose, cycles): loose holds the
+    quests placed that way, and cycles lists the loops blocking the
+    quests left out of order. O(quests + prerequisites).
+    """
+    in_degree = {}
+    dependents = {}
+    group_owner = []
+    group_remaining = []
+    group_waiting = {}
+    or_ready = []
+
+    for q_id, groups in prerequisite_groups.items():
+        referenced = set()
+        for group in groups:
+            members = {p for p in group if p in prerequisite_groups}
+            referenced.update(members)
+            group_id = len(group_owner)
+            group_owner.append(q_id)
+            group_remaining.append(len(members))
+            if not members:
+                or_ready.append(q_id)
+            for prereq in members:
+                group_waiting.setdefault(prereq, []).append(group_id)
+        in_degree[q_id] = len(referenced)
+        for prereq in referenced:
+            dependents.setdefault(prereq, []).append(q_id)
+
+    ready = [q_id for q_id, degree in in_degree.items() if degree == 0]
+    placed = set()
+    loose = set()
+    order = []
+    while ready or or_ready:
+        if ready:
+            q_id = ready.pop()
+        else:
+            q_id = or_ready.pop()
+            if q_id not in placed:
+                loose.add(q_id)
+        if q_id in placed:
+            continue
+        placed.add(q_id)
+        order.append(q_id)
+
+        for dependent in dependents.get(q_id, ()):
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                ready.append(dependent)
+        for group_id in group_waiting.get(q_id, ()):
+            group_remaining[group_id] -= 1
+            if group_remaining[group_id] == 0:
+                or_ready.append(group_owner[group_id])
+
+    cycles = []
+    if len(order) < len(prerequisite_groups):
+        stuck = {}
+        for q_id, groups in prerequisite_groups.items():
+            if q_id not in placed:
+                stuck[q_id] = list(dict.fromkeys(
+                    p for group in groups for p in group if p in prerequisite_groups and p not in placed
+                ))
+        cycles = _find_prerequisite_cycles(stuck)
+    return order, loose, cycles
+
+
+def _find_prerequisite_cycles(prerequisites):
+    """Iterative Tarjan SCC search; returns components that form cycles."""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    cycles = []
+    counter = 0
+
+    for start in prerequisites:
+        if start in index:
+            continue
+
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(prerequisites[start]))]
+
+        while work:
+            node, edges = work[-1]
+            descended = False
+            for prereq in edges:
+                if prereq not in prerequisites:
+                    continue
+                if prereq not in index:
+                    index[prereq] = low[prereq] = counter
+                    counter += 1
+                    stack.append(prereq)
+                    on_stack.add(prereq)
+                    work.append((prereq, iter(prerequisites[prereq])))
+                    descended = True
+                    break
+                if prereq in on_stack:
+                    low[node] = min(low[node], index[prereq])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in prerequisites[node]:
+                    component.reverse()
+                    cycles.append(component)
+
+    return cycles
@@ -0,0 +1,575 @@
+"""
+Test Combat Extensions
+Tests loot, enemy data and simulation features built around combat
+"""
+
+import pytest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import battle_events
+import battle_replay
+import battle_simulator
+import character_manager
+import combat_kernel
+import combat_solver
+import combat_system
+import game_data
+import loot_system
+import party_battle
+from custom_exceptions import CorruptedDataError, InvalidDataFormatError, InvalidTargetError
+
+# ============================================================================
+# LOOT TABLE TESTS
+# ============================================================================
+
+def test_alias_table_matches_weights():
+    """Test that alias sampling reproduces the table's weights"""
+    sampler = loot_system.create_sampler(["a", "b", "c"], [1, 2, 7])
+    draws = loot_system.sample_many(sampler, 20000, random.Random(7))
+
+    assert abs(draws.count("a") / 20000 - 0.1) < 0.02
+    assert abs(draws.count("c") / 20000 - 0.7) < 0.02
+
+    with pytest.raises(ValueError):
+        loot_system.build_alias_table([0, 0])
+
+def test_enemy_loot_from_data_file():
+    """Test loading loot tables and rolling drops for a defeated enemy"""
+    tables = loot_system.build_loot_tables(game_data.load_loot_tables("data/loot_tables.txt"))
+    items = game_data.load_items("data/items.txt")
+    enemy = combat_system.create_enemy("goblin")
+
+    drops = loot_system.roll_loot_batch(tables, "goblin", 500, random.Random(1))
+    assert None in drops
+    assert all(drop is None or drop in items for drop in drops)
+
+    drop = loot_system.get_enemy_loot(enemy, tables, random.Random(1))
+    assert drop is None or drop in items
+
+def test_loot_tables_reject_unknown_items(monkeypatch):
+    """Test that a misspelled drop is rejected when the tables are registered"""
+    monkeypatch.setattr(combat_system, "_loot_tables", None)
+    items = game_data.load_items("data/items.txt")
+    typo = {"goblin": {"drops": [("NONE", 50), ("health_poton", 50)]}}
+    with pytest.raises(InvalidTargetError):
+        combat_system.register_loot_tables(typo, items)
+
+    good = {"goblin": {"drops": [("NONE", 50), ("health_potion", 50)]}}
+    assert "goblin" in combat_system.register_loot_tables(good, items)
+
+def test_loot_is_keyed_on_enemy_id_not_name(monkeypatch):
+    """Test that an enemy whose display name differs from its ID still drops loot"""
+    monkeypatch.setattr(combat_system, "_enemy_templates", None)
+    monkeypatch.setattr(combat_system, "_enemy_prototypes", None)
+    monkeypatch.setattr(combat_system, "_loot_tables", None)
+    troll = dict(combat_system.DEFAULT_ENEMIES["orc"], name="Cave Troll")
+    combat_system.register_enemies({"cave_troll": troll})
+    items = game_data.load_items("data/items.txt")
+    combat_system.register_loot_tables({"cave_troll": {"drops": [("steel_armor", 1)]}}, items)
+
+    enemy = combat_system.create_enemy("cave_troll")
+    assert enemy["enemy_id"] == "cave_troll" and enemy["name"] == "Cave Troll"
+    assert combat_system.get_victory_loot(enemy) == ["steel_armor"]
+
+def test_explore_adds_loot_to_inventory(monkeypatch, capsys):
+    """Test that winning a battle while exploring awards a loot drop"""
+    import main
+    main.load_game_data()
+    assert "dragon" in combat_system.get_loot_tables()
+
+    # The dragon table has no "nothing" entry, so a win always drops an item
+    dragon = dict(combat_system.create_enemy("dragon"), health=1)
+    monkeypatch.setattr(combat_system, "get_random_enemy_for_level", lambda level: dragon)
+    monkeypatch.setattr("builtins.input", lambda *args: "1")
+    main.current_character = character_manager.create_character("LootTest", "Warrior")
+    main.explore()
+
+    assert len(main.current_character['inventory']) == 1
+    assert main.current_character['inventory'][0] in main.all_items
+    assert "Dragon dropped:" in capsys.readouterr().out
+    main.current_character = None
+
+# ============================================================================
+# HEADLESS BATTLE TESTS
+# ============================================================================
+
+def test_headless_battle_returns_result_record(capsys):
+    """Test that a policy-driven battle runs without input or output"""
+    char = character_manager.create_character("Headless", "Warrior")
+    enemy = combat_system.create_enemy("goblin")
+
+    result = combat_system.run_headless_battle(char, enemy, combat_system.AlwaysAttackPolicy())
+    assert result["winner"] == "player"
+    assert result["turns"] == 4
+    assert result["enemy_health"] == 0
+    assert result["character_health"] == 120 - 3 * 5
+    assert (result["xp_gained"], result["gold_gained"]) == (25, 10)
+    assert capsys.readouterr().out == ""
+
+def test_headless_battle_policies_and_event_sink():
+    """Test scripted, ability and flee policies with an event sink"""
+    sink = battle_events.CollectingSink()
+    char = character_manager.create_character("Scripted", "Mage")
+    policy = combat_system.ScriptedPolicy(["ability", "attack"])
+    stream = battle_events.EventStream([sink])
+    battle = combat_system.SimpleBattle(char, combat_system.create_enemy("goblin"), policy, stream)
+    result = battle.start_battle()
+    messages = [event.render() for event in sink.events]
+    assert messages[0] == "Battle begins!"
+    assert "Mage Fireball! 40 damage scorches the enemy!" in messages
+    assert result["winner"] == "player"
+
+    # Clerics only heal once they drop below half health
+    cleric = character_manager.create_character("Healer", "Cleric")
+    cleric['health'] = 80
+    fake = combat_system.SimpleBattle(cleric, combat_system.create_enemy("goblin"))
+    ability = combat_system.AbilityWhenReadyPolicy(heal_below=0.5)
+    assert ability.choose_action(fake) == "attack"
+    cleric['health'] = 40
+    assert ability.choose_action(fake) == "ability"
+
+    # Fleeing from a dragon ends the battle as an escape, not a defeat
+    rogue = character_manager.create_character("Runner", "Rogue")
+    flee = combat_system.FleeBelowPolicy(threshold=1.0)
+    result = combat_system.run_headless_battle(rogue, combat_system.create_enemy("dragon"), flee, rng=random.Random(3))
+    assert result["winner"] in ("escaped", "enemy")
+    assert result["xp_gained"] == 0
+
+def test_headless_battle_turn_cap_is_a_draw():
+    """Test that a battle nobody can win stops at the turn cap"""
+    char = character_manager.create_character("Stalemate", "Cleric")
+    char['health'] = char['max_health'] = 5000
+    enemy = {'name': 'Dummy', 'health': 10, 'max_health': 10, 'strength': 0,
+             'magic': 0, 'xp_reward': 0, 'gold_reward': 0}
+    policy = combat_system.ScriptedPolicy([], default="wait")
+
+    result = combat_system.run_headless_battle(char, enemy, policy)
+    assert result["winner"] == "draw"
+    assert result["turns"] == combat_system.MAX_BATTLE_TURNS
+
+# ============================================================================
+# BATTLE SIMULATOR TESTS
+# ============================================================================
+
+def test_create_character_at_level_matches_level_ups():
+    """Test that simulated characters match ones levelled through play"""
+    char = battle_simulator.create_character_at_level("Mage", 3)
+    assert (char['max_health'], char['strength'], char['magic']) == (100, 12, 24)
+    assert char['health'] == 100
+
+def test_simulate_matchup_is_reproducible():
+    """Test seeded simulation results and summary statistics"""
+    first = battle_simulator.simulate_matchup("Rogue", 1, "orc", 300, "ability", seed=5, workers=1, chunk_size=100)
+    again = battle_simulator.simulate_matchup("Rogue", 1, "orc", 300, "ability", seed=5, workers=1, chunk_size=100)
+    assert first == again
+    assert first["battles"] == 300
+    assert sum(first["turns"]["distribution"].values()) == 300
+
+    low, high = first["win_rate_ci"]
+    assert low <= first["win_rate"] <= high
+    assert first["hp_percentiles"][5] <= first["hp_percentiles"][95]
+
+    # A deterministic matchup is always won
+    warrior = battle_simulator.simulate_matchup("Warrior", 1, "goblin", 50, "attack", workers=1)
+    assert warrior["win_rate"] == 1.0
+    assert warrior["turns"]["distribution"] == {4: 50}
+
+def test_wilson_interval():
+    """Test the win rate confidence interval"""
+    low, high = battle_simulator.wilson_interval(50, 100)
+    assert abs(low - 0.4038) < 0.001
+    assert abs(high - 0.5962) < 0.001
+    assert battle_simulator.wilson_interval(0, 0) == (0.0, 1.0)
+
+# ============================================================================
+# COMBAT KERNEL TESTS
+# ============================================================================
+
+def test_kernel_matches_simple_battle():
+    """Test that lockstep batches agree with one-at-a-time battles"""
+    warrior = character_manager.create_character("Kernel", "Warrior")
+    goblin = combat_system.create_enemy("goblin")
+    batch = combat_kernel.run_matchup_batch(warrior, goblin, 3, "attack")
+    assert batch["winner"] == ["player"] * 3
+    assert batch["turns"] == [4] * 3
+    assert batch["character_health"] == [105] * 3
+    assert warrior['health'] == 120 and goblin['health'] == 50
+
+    # Identical tallies when no random rolls are involved
+    for policy in ("attack", "ability"):
+        battle = battle_simulator.simulate_matchup("Mage", 2, "orc", 200, policy, seed=2, workers=1)
+        kernel = battle_simulator.simulate_matchup("Mage", 2, "orc", 200, policy, seed=2, workers=1, engine="kernel")
+        assert battle == kernel
+
+    # Random crits and escapes: same distribution within sampling error
+    battle = battle_simulator.simulate_matchup("Rogue", 1, "orc", 4000, seed=3, workers=1)
+    kernel = battle_simulator.simulate_matchup("Rogue", 1, "orc", 4000, seed=4, workers=1, engine="kernel")
+    assert abs(battle["win_rate"] - kernel["win_rate"]) < 0.03
+    battle = battle_simulator.simulate_matchup("Mage", 2, "orc", 4000, "flee", seed=3, workers=1)
+    kernel = battle_simulator.simulate_matchup("Mage", 2, "orc", 4000, "flee", seed=4, workers=1, engine="kernel")
+    assert abs(battle["outcomes"]["escaped"] - kernel["outcomes"]["escaped"]) / 4000 < 0.04
+
+    with pytest.raises(ValueError):
+        combat_kernel.run_battle_batch([warrior], [], "attack")
+
+# ============================================================================
+# COMBAT SOLVER TESTS
+# ============================================================================
+
+def test_closed_form_matches_simple_battle():
+    """Test the O(1) solver against real deterministic battles"""
+    for char_class in ("Warrior", "Mage", "Rogue", "Cleric"):
+        for enemy_type in ("goblin", "orc", "dragon"):
+            char = battle_simulator.create_character_at_level(char_class, 2)
+            enemy = combat_system.create_enemy(enemy_type)
+            solved = combat_solver.solve_deterministic(char, enemy, "attack")
+            result = combat_system.run_headless_battle(char, enemy, combat_system.AlwaysAttackPolicy())
+            for key in solved:
+                assert solved[key] == result[key]
+
+    mage = character_manager.create_character("Solver", "Mage")
+    assert combat_solver.is_deterministic(mage, combat_system.create_enemy("orc"), "ability")
+    rogue = character_manager.create_character("Solver", "Rogue")
+    assert not combat_solver.is_deterministic(rogue, combat_system.create_enemy("orc"), "ability")
+    with pytest.raises(ValueError):
+        combat_solver.solve_deterministic(rogue, combat_system.create_enemy("orc"), "ability")
+
+def test_exact_distribution_for_random_fights():
+    """Test exact win probabilities for fights with random rolls"""
+    from fractions import Fraction
+    rogue = character_manager.create_character("Solver", "Rogue")
+    solved = combat_solver.solve_matchup(rogue, combat_system.create_enemy("orc"), exact=True)
+    assert solved["outcomes"] == {"player": Fraction(121, 128), "enemy": Fraction(7, 128)}
+    assert sum(solved["turns"].values()) == 1
+
+    # Fleeing at 25% HP escapes half the time, then the orc finishes the job
+    mage = battle_simulator.create_character_at_level("Mage", 2)
+    fled = combat_solver.solve_distribution(mage, combat_system.create_enemy("orc"), "flee")
+    simulated = battle_simulator.simulate_matchup("Mage", 2, "orc", 4000, "flee", workers=1)
+    assert abs(fled["outcomes"]["escaped"] - simulated["outcomes"]["escaped"] / 4000) < 0.03
+
+    # Heals are HP-dependent but not random, so one real battle must agree
+    cleric = character_manager.create_character("Solver", "Cleric")
+    chance = combat_solver.win_probability(cleric, combat_system.create_enemy("dragon"))
+    result = combat_system.run_headless_battle(cleric, combat_system.create_enemy("dragon"),
+                                               combat_system.AbilityWhenReadyPolicy())
+    assert chance == (1.0 if result["winner"] == "player" else 0)
+
+# ============================================================================
+# ENEMY REGISTRY TESTS
+# ============================================================================
+
+def test_enemy_data_file_and_prototypes():
+    """Test loading enemies.txt and cloning enemies from prototypes"""
+    enemies = game_data.load_enemies("data/enemies.txt")
+    assert {"goblin", "orc", "dragon", "troll"} <= set(enemies)
+    assert enemies["orc"]["max_health"] == 80
+
+    prototypes = combat_system.register_enemies(enemies)
+    with pytest.raises(TypeError):
+        prototypes["goblin"]["health"] = 1
+
+    first = combat_system.create_enemy("Goblin")
+    second = combat_system.create_enemy("goblin")
+    first["health"] -= 10
+    assert second["health"] == 50
+    assert combat_system.create_enemy("goblin")["health"] == 50
+    assert "troll" in combat_system.get_enemy_types()
+
+    with pytest.raises(InvalidTargetError):
+        combat_system.create_enemy("unicorn")
+
+def test_enemy_block_validation():
+    """Test that malformed enemy blocks are rejected"""
+    with pytest.raises(InvalidDataFormatError):
+        game_data.parse_enemy_block(["ENEMY_ID: imp", "HEALTH: lots"])
+    with pytest.raises(InvalidDataFormatError):
+        game_data.validate_enemy_data(game_data.parse_enemy_block(["ENEMY_ID: imp", "NAME: Imp"]))
+
+    # Default definitions stand in when no enemy file was loaded
+    combat_system.register_enemies(combat_system.DEFAULT_ENEMIES)
+    assert combat_system.get_enemy_types() == ["goblin", "orc", "dragon"]
+    combat_system.register_enemies(game_data.load_enemies("data/enemies.txt"))
+
+# ============================================================================
+# SPAWN TABLE TESTS
+# ============================================================================
+
+def test_spawn_bands_and_random_spawns():
+    """Test level band lookup and weighted spawns from the data file"""
+    bands = game_data.load_spawn_tables("data/spawn_tables.txt")
+    assert [band["min_level"] for band in bands] == [1, 3, 6, 10]
+    combat_system.register_spawn_tables(bands)
+
+    assert combat_system.get_spawn_sampler(4)["outcomes"][0] == "orc"
+    assert combat_system.get_spawn_sampler(0) is combat_system.get_spawn_sampler(2)
+    assert combat_system.get_spawn_sampler(5000) is combat_system.get_spawn_sampler(10)
+
+    rng = random.Random(11)
+    spawned = {combat_system.get_random_enemy_for_level(1, rng)["name"] for _ in range(200)}
+    assert spawned == {"Goblin", "Wolf", "Bandit"}
+
+    types = combat_system.roll_spawn_types([1, 4, 7, 12] * 1000, random.Random(2))
+    assert len(types) == 4000
+    assert types[3::4].count("dragon") > 400
+    assert "dragon" not in types[0::4]
+
+    assert combat_system.roll_spawn_types([], random.Random(2)) == []
+    assert combat_system.roll_spawn_types(iter([2, 2]), random.Random(2)) == \
+        loot_system.sample_many(combat_system.get_spawn_sampler(2), 2, random.Random(2))
+
+    enemies = combat_system.spawn_enemies_for_levels([1, 20], random.Random(3))
+    assert len(enemies) == 2 and enemies[0] is not enemies[1]
+
+def test_spawn_table_validation():
+    """Test that bad spawn data is rejected"""
+    with pytest.raises(InvalidDataFormatError):
+        game_data.validate_spawn_data({"min_level": 5, "max_level": 1, "enemies": [("orc", 1)]})
+    with pytest.raises(InvalidTargetError):
+        combat_system.register_spawn_tables([{"min_level": 1, "max_level": 5, "enemies": [("unicorn", 1)]}])
+
+    # Bands must not leave gaps or overlap, whether loaded or registered directly
+    low = {"min_level": 1, "max_level": 5, "enemies": [("orc", 1)]}
+    with pytest.raises(InvalidDataFormatError):
+        combat_system.register_spawn_tables([low, {"min_level": 8, "max_level": 9, "enemies": [("troll", 1)]}])
+    with pytest.raises(InvalidDataFormatError):
+        game_data.validate_spawn_bands([low, {"min_level": 5, "max_level": 9, "enemies": [("troll", 1)]}])
+
+# ============================================================================
+# BATTLE EVENT TESTS
+# ============================================================================
+
+def test_battle_event_stream_and_sinks(tmp_path):
+    """Test typed events, batched flushing and the JSON Lines sink"""
+    import json
+    sink = battle_events.CollectingSink()
+    path = str(tmp_path / "battle.jsonl")
+    stream = battle_events.EventStream([sink, battle_events.JsonLinesSink(path)], capacity=4)
+
+    char = character_manager.create_character("Events", "Warrior")
+    result = combat_system.run_headless_battle(
+        char, combat_system.create_enemy("goblin"), combat_system.AlwaysAttackPolicy(), stream
+    )
+    stream.close()
+
+    kinds = [event.kind for event in sink.events]
+    assert kinds[0] == "battle_start"
+    assert kinds[-2:] == ["death", "reward"]
+    assert kinds.count("attack") == 7
+    first_hit = sink.events[2]
+    assert isinstance(first_hit, battle_events.AttackEvent)
+    assert (first_hit.attacker, first_hit.damage, first_hit.target_health) == ("Events", 13, 37)
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == len(sink.events)
+    assert records[-1] == {"type": "reward", "turn": result["turns"], "xp": 25, "gold": 10}
+
+def test_event_buffer_flushes_in_batches(capsys):
+    """Test that events are rendered only when the buffer fills or is flushed"""
+    stream = battle_events.EventStream([battle_events.ConsoleSink()], capacity=3)
+    stream.emit(battle_events.EscapeEvent(1, "Hero", False))
+    stream.emit(battle_events.DeathEvent(2, "Hero"))
+    assert capsys.readouterr().out == ""
+
+    stream.emit(battle_events.RewardEvent(2, 5, 1))
+    assert capsys.readouterr().out.count(">>> ") == 3
+    stream.emit(battle_events.EscapeEvent(3, "Hero", True))
+    stream.close()
+    assert capsys.readouterr().out == ">>> You successfully escaped!\n"
+
+    with pytest.raises(ValueError):
+        battle_events.EventStream(capacity=0)
+
+# ============================================================================
+# BATTLE REPLAY TESTS
+# ============================================================================
+
+def test_record_and_replay_battle(tmp_path):
+    """Test that a recorded battle replays to the same outcome"""
+    rogue = character_manager.create_character("Replay", "Rogue")
+    policy = combat_system.ScriptedPolicy(["ability", "oops", "run"], default="ability")
+    result, replay = battle_replay.record_battle(rogue, combat_system.create_enemy("orc"), policy, seed=42)
+    assert len(replay) < 100
+
+    decoded = battle_replay.decode_replay(replay)
+    assert decoded["seed"] == 42
+    assert decoded["character"]["health"] == 90
+    assert decoded["actions"][:3] == ["ability", None, "run"]
+    assert decoded["winner"] == result["winner"]
+
+    assert battle_replay.replay_battle(replay) == result
+    assert battle_replay.verify_replay(replay)
+
+    path = str(tmp_path / "replays.bin")
+    battle_replay.write_replays(path, [replay, replay])
+    assert list(battle_replay.read_replays(path)) == [replay, replay]
+
+def test_replay_opcodes_and_corruption():
+    """Test 2-bit action packing and rejection of damaged replays"""
+    actions = ["attack", "ability", "run", None, "attack"]
+    packed = battle_replay.pack_actions(actions)
+    assert len(packed) == 2
+    assert battle_replay.unpack_actions(packed, 5) == actions
+
+    with pytest.raises(CorruptedDataError):
+        battle_replay.decode_replay(b"nope")
+    char = character_manager.create_character("Replay", "Mage")
+    _, replay = battle_replay.record_battle(char, combat_system.create_enemy("goblin"), combat_system.AlwaysAttackPolicy(), seed=1)
+    with pytest.raises(CorruptedDataError):
+        battle_replay.decode_replay(replay[:-1])
+
+def test_replay_checks_final_health_and_console_log(monkeypatch, capsys):
+    """Test that verification compares final HP and console replays show a log"""
+    char = character_manager.create_character("Replay", "Warrior")
+    result, replay = battle_replay.record_battle(char, combat_system.create_enemy("goblin"),
+                                                 combat_system.AlwaysAttackPolicy(), seed=5)
+    decoded = battle_replay.decode_replay(replay)
+    assert decoded["character_health"] == result["character_health"]
+    assert decoded["enemy_health"] == 0
+
+    # Same winner and turns, different final health
+    offset = len(replay) - len(battle_replay.pack_actions(decoded["actions"])) - battle_replay.OUTCOME.size
+    outcome = list(battle_replay.OUTCOME.unpack_from(replay, offset))
+    outcome[2] -= 1
+    tampered = replay[:offset] + battle_replay.OUTCOME.pack(*outcome) + replay[offset + battle_replay.OUTCOME.size:]
+    assert battle_replay.verify_replay(replay)
+    assert not battle_replay.verify_replay(tampered)
+
+    monkeypatch.setattr("builtins.input", lambda *args: "1")
+    char = character_manager.create_character("Replay", "Warrior")
+    battle_replay.record_battle(char, combat_system.create_enemy("goblin"), seed=5)
+    output = capsys.readouterr().out
+    assert "Battle begins!" in output and "has been defeated!" in output
+
+def test_replays_from_before_cooldowns_are_rejected():
+    """Test that version 1 replays fail verification instead of raising"""
+    warrior = character_manager.create_character("Replay", "Warrior")
+    policy = combat_system.ScriptedPolicy(["ability"] * 5)
+    _, replay = battle_replay.record_battle(warrior, combat_system.create_enemy("troll"), policy, seed=3)
+    assert battle_replay.replay_version(replay) == battle_replay.REPLAY_VERSION == 2
+    assert battle_replay.verify_replay(replay)
+
+    old_replay = replay[:4] + bytes([1]) + replay[5:]
+    assert battle_replay.verify_replay(old_replay) is False
+    with pytest.raises(CorruptedDataError):
+        battle_replay.decode_replay(old_replay)
+
+# ============================================================================
+# PARTY BATTLE TESTS
+# ============================================================================
+
+def test_initiative_order_and_targeting():
+    """Test that faster combatants act more often and hit the weakest foe"""
+    fast = {'name': 'Fast', 'class': 'Warrior', 'health': 500, 'max_health': 500,
+            'strength': 1, 'magic': 0, 'speed': 30}
+    slow = {'name': 'Slow', 'health': 500, 'max_health': 500, 'strength': 1,
+            'magic': 0, 'speed': 10, 'xp_reward': 0, 'gold_reward': 0}
+    weak = dict(slow, name='Weak', health=50)
+    battle = party_battle.PartyBattle([fast], [slow, weak], use_abilities=False, max_actions=10)
+    result = battle.start_battle()
+
+    assert result["winner"] == "draw"
+    # Fast acts 3 times per enemy action: 6 of the first 10 actions
+    assert result["enemy_health"] == [500, 44]
+    assert result["party_health"] == [496]
+    assert battle.weakest(party_battle.ENEMIES) == 2
+
+def test_party_battle_removes_dead_combatants():
+    """Test a full party battle against a group with rewards"""
+    party = [battle_simulator.create_character_at_level(c, 3) for c in ("Warrior", "Mage", "Rogue", "Cleric")]
+    enemies = [combat_system.create_enemy(t) for t in ("goblin", "goblin", "orc", "wolf")]
+    result = party_battle.run_party_battle(party, enemies, random.Random(1))
+
+    assert result["winner"] == "party"
+    assert result["enemy_health"] == [0, 0, 0, 0]
+    assert result["xp_gained"] == 25 + 25 + 50 + 20
+    assert len(result["survivors"]) == sum(1 for hp in result["party_health"] if hp > 0)
+
+    # A raid: dozens of combatants, one action each per initiative pop
+    raid = [battle_simulator.create_character_at_level(c, 4) for c in ("Warrior", "Mage", "Rogue", "Cleric") * 8]
+    horde = [combat_system.create_enemy(t) for t in ("orc", "skeleton", "troll") * 10]
+    result = party_battle.run_party_battle(raid, horde, random.Random(2))
+    assert result["winner"] in ("party", "enemies")
+
+    with pytest.raises(InvalidTargetError):
+        party_battle.PartyBattle([], enemies)
+
+# ============================================================================
+# ABILITY COOLDOWN TESTS
+# ============================================================================
+
+def test_ability_cooldowns_in_simple_battle():
+    """Test that abilities are dispatched by class and respect cooldowns"""
+    from custom_exceptions import AbilityOnCooldownError
+    assert combat_system.CLASS_ABILITIES["mage"]["use"] is combat_system.mage_fireball
+    tracker = combat_system.CooldownTracker(2)
+    tracker.trigger(1, 4, 3)
+    assert tracker.is_ready(0, 4) and not tracker.is_ready(1, 6) and tracker.is_ready(1, 7)
+    assert tracker.remaining(1, 5) == 2
+
+    # A headless policy picking an ability on cooldown loses that turn
+    mage = character_manager.create_character("Cooldown", "Mage")
+    sink = battle_events.CollectingSink()
+    battle = combat_system.SimpleBattle(mage, combat_system.create_enemy("troll"),
+                                        combat_system.ScriptedPolicy(["ability", "ability"]),
+                                        battle_events.EventStream([sink]))
+    battle.start_battle()
+    skipped = [e for e in sink.events if e.kind == "skipped_turn"]
+    assert skipped[0].turn == 2 and skipped[0].reason == "cooldown"
+    battle.cooldowns.trigger(0, battle.turn_count, 3)
+    assert not battle.ability_ready()
+    with pytest.raises(AbilityOnCooldownError):
+        battle.use_ability()
+
+    # Scripted warrior abilities on every turn no longer abort the battle
+    warrior = character_manager.create_character("Cooldown", "Warrior")
+    result = combat_system.run_headless_battle(warrior, combat_system.create_enemy("troll"),
+                                               combat_system.ScriptedPolicy(["ability"] * 5))
+    assert result["winner"] in ("player", "enemy")
+
+    # Fireball every third turn: 40, 6, 6, 40 against the 80 HP orc
+    mage = character_manager.create_character("Cooldown", "Mage")
+    result = combat_system.run_headless_battle(mage, combat_system.create_enemy("orc"),
+                                               combat_system.AbilityWhenReadyPolicy())
+    assert result["winner"] == "player"
+    assert result["turns"] == 4
+
+def test_cooldowns_in_kernel_and_solver():
+    """Test that the batch kernel and solver follow the same cooldowns"""
+    warrior = battle_simulator.create_character_at_level("Warrior", 2)
+    troll = combat_system.create_enemy("troll")
+    solved = combat_solver.solve_deterministic(warrior, troll, "ability")
+    batch = combat_kernel.run_matchup_batch(warrior, troll, 1, "ability")
+    result = combat_system.run_headless_battle(warrior, troll, combat_system.AbilityWhenReadyPolicy())
+    assert solved["turns"] == batch["turns"][0] == result["turns"]
+    assert solved["winner"] == batch["winner"][0] == result["winner"]
+
+def test_kernel_and_solver_follow_class_ability_registry(monkeypatch):
+    """Test that changing CLASS_ABILITIES changes every engine the same way"""
+    abilities = combat_system.CLASS_ABILITIES
+    monkeypatch.setitem(abilities, "warrior", dict(abilities["warrior"], multiplier=3))
+    monkeypatch.setitem(abilities, "rogue", dict(abilities["rogue"], chance=0.25))
+
+    warrior = battle_simulator.create_character_at_level("Warrior", 2)
+    troll = combat_system.create_enemy("troll")
+    columns = combat_kernel.build_fight_columns([warrior], [troll])
+    assert columns["ability_amount"][0] == warrior["strength"] * 3
+    solved = combat_solver.solve_deterministic(warrior, troll, "ability")
+    result = combat_system.run_headless_battle(dict(warrior), dict(troll), combat_system.AbilityWhenReadyPolicy())
+    assert (solved["winner"], solved["turns"]) == (result["winner"], result["turns"])
+
+    rogue = battle_simulator.create_character_at_level("Rogue", 3)
+    columns = combat_kernel.build_fight_columns([rogue], [troll])
+    assert columns["ability_kind"][0] == combat_kernel.ABILITY_CRIT
+    assert columns["ability_chance"][0] == 0.25
+    exact = combat_solver.win_probability(rogue, troll, exact=True)
+    batch = combat_kernel.run_matchup_batch(rogue, troll, 20000, rng=random.Random(4))
+    assert abs(batch["winner"].count("player") / 20000 - float(exact)) < 0.02
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,186 @@
+"""
+Test Inventory Extensions
+Tests the shop index and other inventory features built on the core module
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import character_manager
+import inventory_system
+import game_data
+from custom_exceptions import InventoryError, InvalidQuantityError
+
+# ============================================================================
+# SHOP INDEX TESTS
+# ============================================================================
+
+def test_shop_index_affordable_and_range_queries():
+    """Test bisect-based shop queries against the real item catalog"""
+    items = game_data.load_items("data/items.txt")
+    index = inventory_system.build_shop_index(items)
+
+    affordable = inventory_system.get_affordable_items(index, "weapon", 200)
+    assert affordable["items"] == ["iron_sword", "fire_staff"]
+    assert affordable["total_items"] == 2
+
+    armor = inventory_system.get_items_in_price_range(index, "armor", 100, 300)
+    assert armor["items"] == ["magic_robe", "steel_armor"]
+
+    assert inventory_system.get_cheapest_item(index, "consumable", "health") == "health_potion"
+    assert inventory_system.get_cheapest_item(index, "consumable", "luck") is None
+
+def test_shop_index_pagination():
+    """Test that shop results are split into pages"""
+    items = {}
+    for i in range(25):
+        items[f"potion_{i:02d}"] = {
+            'item_id': f"potion_{i:02d}", 'type': 'consumable',
+            'effect': 'health:10', 'cost': i
+        }
+    index = inventory_system.build_shop_index(items)
+
+    page = inventory_system.get_affordable_items(index, "consumable", 100, page=3, page_size=10)
+    assert page["total_pages"] == 3
+    assert page["items"] == ["potion_20", "potion_21", "potion_22", "potion_23", "potion_24"]
+
+    empty = inventory_system.get_affordable_items(index, "weapon", 100)
+    assert empty["items"] == []
+    assert empty["total_pages"] == 0
+
+    with pytest.raises(InvalidQuantityError):
+        inventory_system.get_affordable_items(index, "consumable", 100, page=0)
+    with pytest.raises(InventoryError):
+        inventory_system.get_items_in_price_range(index, "consumable", 0, 10, page_size=0)
+
+# ============================================================================
+# BATCH TRANSACTION TESTS
+# ============================================================================
+
+def test_purchase_and_sell_baskets():
+    """Test buying and selling several items in one transaction"""
+    char = character_manager.create_character("BasketTest", "Rogue")
+    items = game_data.load_items("data/items.txt")
+    char['gold'] = 500
+
+    cost = inventory_system.purchase_items(char, [("health_potion", 3), ("iron_sword", 1)], items)
+    assert cost == 175
+    assert char['gold'] == 325
+    assert inventory_system.count_item(char, "health_potion") == 3
+
+    earned = inventory_system.sell_items(char, [("health_potion", 2)], items)
+    assert earned == 24
+    assert char['gold'] == 349
+    assert char['inventory'] == ["health_potion", "iron_sword"]
+
+def test_batch_transactions_are_all_or_nothing():
+    """Test that a failing basket leaves the character unchanged"""
+    from custom_exceptions import InsufficientResourcesError, InventoryFullError, ItemNotFoundError
+    char = character_manager.create_character("RollbackTest", "Cleric")
+    items = game_data.load_items("data/items.txt")
+
+    with pytest.raises(InsufficientResourcesError):
+        inventory_system.purchase_items(char, [("health_potion", 2), ("steel_sword", 1)], items)
+    with pytest.raises(InventoryFullError):
+        inventory_system.purchase_items(char, [("health_potion", 1)] * 21, {**items, 'health_potion': {'cost': 0}})
+    with pytest.raises(ItemNotFoundError):
+        inventory_system.sell_items(char, [("health_potion", 1)], items)
+    with pytest.raises(InvalidQuantityError):
+        inventory_system.purchase_items(char, [("health_potion", 1), ("health_potion", 0)], items)
+    with pytest.raises(InventoryError):
+        inventory_system.sell_items(char, [("health_potion", -1)], items)
+
+    assert char['gold'] == 100
+    assert char['inventory'] == []
+
+# ============================================================================
+# DERIVED STAT TESTS
+# ============================================================================
+
+def test_equipment_modifies_derived_stats_only():
+    """Test that equipping and unequipping leaves base stats untouched"""
+    char = character_manager.create_character("DerivedTest", "Warrior")
+    char['inventory'] = ["iron_sword", "steel_armor"]
+
+    inventory_system.equip_weapon(char, "iron_sword", {'type': 'weapon', 'effect': 'strength:5'})
+    inventory_system.equip_armor(char, "steel_armor", {'type': 'armor', 'name': 'Steel Armor', 'effect': 'max_health:25'})
+    assert char['strength'] == 20
+    assert char['max_health'] == 145
+    assert char['base_strength'] == 15
+
+    # Level-ups raise base stats and keep equipment bonuses
+    character_manager.gain_experience(char, 100)
+    assert char['strength'] == 22
+    assert char['health'] == char['max_health'] == 155
+
+    inventory_system.unequip_armor(char)
+    assert char['max_health'] == 130
+    assert char['health'] == 130
+    assert "steel_armor" in char['inventory']
+
+def test_legacy_save_with_weapon_migrates_base_stats(tmp_path):
+    """Test that a save without base stats does not count equipment twice"""
+    items = game_data.load_items("data/items.txt")
+    inventory_system.reload_item_catalog(items)
+
+    # Older saves stored strength with the sword's +5 already added
+    legacy = character_manager.create_character("LegacyTest", "Warrior")
+    for stat in character_manager.DERIVED_STATS:
+        del legacy["base_" + stat]
+    legacy['strength'] = 20
+    legacy['equipped_weapon'] = "iron_sword"
+    legacy['inventory'] = ["health_potion", "health_potion"]
+    character_manager.save_character(legacy, str(tmp_path))
+
+    char = character_manager.load_character("LegacyTest", str(tmp_path))
+    character_manager.refresh_derived_stats(char)
+    assert char['base_strength'] == 15
+    assert char['strength'] == 20
+
+    inventory_system.unequip_weapon(char)
+    assert char['strength'] == 15
+
+# ============================================================================
+# ITEM REGISTRY TESTS
+# ============================================================================
+
+def test_item_registry_lookup_and_hot_reload():
+    """Test that equipment is resolved by ID through the shared registry"""
+    items = game_data.load_items("data/items.txt")
+    inventory_system.reload_item_catalog(items)
+    try:
+        registry = game_data.get_item_registry()
+        with pytest.raises(TypeError):
+            registry['iron_sword']['cost'] = 1
+
+        char = character_manager.create_character("RegistryTest", "Warrior")
+        char['inventory'] = ["iron_sword"]
+        inventory_system.equip_weapon(char, "iron_sword")
+        assert char['strength'] == 20
+        assert 'item_data' not in char
+
+        # A new catalog version re-resolves the equipped sword
+        buffed = dict(items)
+        buffed['iron_sword'] = dict(items['iron_sword'], effect='strength:8')
+        old_version = game_data.get_item_registry_version()
+        assert inventory_system.reload_item_catalog(buffed, [char]) == old_version + 1
+        assert char['strength'] == 23
+
+        # A catalog without the sword drops its bonus
+        removed = dict(items)
+        del removed['iron_sword']
+        inventory_system.reload_item_catalog(removed, [char])
+        assert char['strength'] == 15
+
+        inventory_system.reload_item_catalog(items, [char])
+        assert char['strength'] == 20
+        inventory_system.unequip_weapon(char)
+        assert char['strength'] == 15
+    finally:
+        inventory_system.reload_item_catalog(items)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,397 @@
+"""
+Test Quest Indexes
+Tests the quest graph and the indexes built on top of the quest catalog
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import character_manager
+import quest_handler
+import quest_analytics
+import game_data
+from custom_exceptions import InvalidDataFormatError
+
+
+def brute_force_available(character, quests):
+    """Reference answer: check every quest in the catalog"""
+    return [q_id for q_id in quests if quest_handler.can_accept_quest(character, q_id, quests)]
+
+# ============================================================================
+# QUEST GRAPH TESTS
+# ============================================================================
+
+def test_quest_graph_structure():
+    """Test adjacency, topological order and level buckets"""
+    quests = game_data.load_quests("data/quests.txt")
+    graph = quest_handler.build_quest_graph(quests)
+
+    assert sorted(graph.dependents['first_steps']) == ['equipment_upgrade', 'goblin_hunter']
+    order = graph.topological_order
+    assert len(order) == len(quests)
+    for q_id, quest in quests.items():
+        for prereq in quest_handler.get_quest_prerequisites(quest):
+            assert order.index(prereq) < order.index(q_id)
+    assert graph.level_buckets[3] == ['orc_menace', 'treasure_hunter']
+
+def test_graph_availability_matches_full_scan():
+    """Test that graph-based availability equals the per-quest check"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("GraphTest", "Warrior")
+
+    for level, completed in [(1, []), (2, ['first_steps']),
+                              (3, ['first_steps', 'goblin_hunter']),
+                              (10, ['first_steps', 'equipment_upgrade'])]:
+        char['level'] = level
+        char['completed_quests'] = list(completed)
+        available = [q['quest_id'] for q in quest_handler.get_available_quests(char, quests)]
+        assert available == brute_force_available(char, quests)
+
+def test_tracked_available_set_stays_in_sync():
+    """Test the live available set through accept, complete, abandon and level-up"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("TrackTest", "Mage")
+    quest_handler.track_available_quests(char, quests)
+
+    def check():
+        available = [q['quest_id'] for q in quest_handler.get_available_quests(char, quests)]
+        assert sorted(available) == sorted(brute_force_available(char, quests))
+
+    check()
+    quest_handler.accept_quest(char, 'first_steps', quests)
+    check()
+    quest_handler.complete_quest(char, 'first_steps', quests)
+    check()
+    character_manager.gain_experience(char, 100)
+    check()
+    quest_handler.accept_quest(char, 'goblin_hunter', quests)
+    check()
+    quest_handler.abandon_quest(char, 'goblin_hunter')
+    check()
+    assert 'goblin_hunter' in char['_quest_tracker']['available']
+
+def test_level_index_range_queries():
+    """Test bisect-based level range queries, counts and reload handling"""
+    quests = game_data.load_quests("data/quests.txt")
+
+    band = [q['quest_id'] for q in quest_handler.get_quests_by_level(quests, 2, 3)]
+    assert band == ['goblin_hunter', 'equipment_upgrade', 'orc_menace', 'treasure_hunter']
+    assert quest_handler.count_quests_by_level(quests, 2, 3) == 4
+    assert quest_handler.count_quests_by_level(quests, 7, 9) == 0
+    assert quest_handler.count_quests_by_level(quests, 5, 1) == 0
+
+    # A reloaded catalog gets a fresh index
+    reloaded = dict(quests)
+    reloaded['side_quest'] = {'quest_id': 'side_quest', 'required_level': 8, 'prerequisite': 'NONE'}
+    assert quest_handler.count_quests_by_level(reloaded, 7, 9) == 1
+
+def test_and_or_prerequisites():
+    """Test multi-prerequisite parsing and bitmask requirement checks"""
+    from custom_exceptions import QuestRequirementsNotMetError
+    quests = game_data.load_quests("data/quests.txt")
+    assert quests['village_champion']['prerequisite_groups'] == [['orc_menace', 'treasure_hunter']]
+    assert quests['scouting_party']['prerequisite_groups'] == [['goblin_hunter'], ['equipment_upgrade']]
+
+    char = character_manager.create_character("MultiPrereqTest", "Warrior")
+    char['level'] = 4
+    for q_id in ['first_steps', 'equipment_upgrade', 'treasure_hunter']:
+        char['completed_quests'].append(q_id)
+
+    # OR: one group is enough
+    assert quest_handler.can_accept_quest(char, 'scouting_party', quests)
+    # AND: every quest in the group is needed
+    with pytest.raises(QuestRequirementsNotMetError):
+        quest_handler.accept_quest(char, 'village_champion', quests)
+
+    char['completed_quests'].append('goblin_hunter')
+    char['completed_quests'].append('orc_menace')
+    quest_handler.accept_quest(char, 'village_champion', quests)
+    assert quest_handler.get_quest_prerequisite_chain('village_champion', quests)[-1] == 'village_champion'
+    assert len(quest_handler.get_quest_prerequisite_chain('village_champion', quests)) == 6
+
+def test_graph_cache_versions_and_completed_masks():
+    """Test graph reuse across catalogs, explicit invalidation and mask caching"""
+    quests = game_data.load_quests("data/quests.txt")
+    other = dict(quests)
+    graph = quest_handler.get_quest_graph(quests)
+    other_graph = quest_handler.get_quest_graph(other)
+    assert quest_handler.get_quest_graph(quests) is graph
+    assert quest_handler.get_quest_graph(other) is other_graph
+
+    char = character_manager.create_character("GraphCacheTest", "Warrior")
+    char['level'] = 4
+    char['completed_quests'].append('first_steps')
+    char['completed_quests'].append('equipment_upgrade')
+    assert quest_handler.can_accept_quest(char, 'scouting_party', quests)
+    assert not any(key.startswith('_') for key in char)
+
+    # Same length, different contents: the cached mask must not be reused
+    char['completed_quests'].remove('equipment_upgrade')
+    char['completed_quests'].append('goblin_hunter')
+    assert quest_handler.can_accept_quest(char, 'scouting_party', quests)
+    assert not quest_handler.can_accept_quest(char, 'treasure_hunter', quests)
+
+    # In-place prerequisite edit followed by explicit invalidation
+    quests['scouting_party'] = dict(quests['scouting_party'], prerequisite='orc_menace',
+                                    prerequisite_groups=[['orc_menace']])
+    version = quest_handler.get_quest_graph_version()
+    assert quest_handler.invalidate_quest_graphs() == version + 1
+    assert quest_handler.get_quest_graph(quests) is not graph
+    assert not quest_handler.can_accept_quest(char, 'scouting_party', quests)
+
+def test_same_size_catalog_edits_are_seen_without_invalidation():
+    """Test that swapping or editing a quest in place never uses a stale graph"""
+    from custom_exceptions import QuestRequirementsNotMetError
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("StaleGraphTest", "Warrior")
+    char['level'] = 10
+    quest_handler.get_quest_graph(quests)
+
+    # Same size catalog, but 'new_quest' was never in the cached graph
+    quests.pop('first_steps')
+    quests['new_quest'] = dict(quests['goblin_hunter'], quest_id='new_quest',
+                               prerequisite='equipment_upgrade',
+                               prerequisite_groups=[['equipment_upgrade']])
+    assert quest_handler.can_accept_quest(char, 'new_quest', quests) is False
+    with pytest.raises(QuestRequirementsNotMetError):
+        quest_handler.accept_quest(char, 'new_quest', quests)
+
+    char['completed_quests'].append('equipment_upgrade')
+    assert quest_handler.accept_quest(char, 'new_quest', quests)
+    assert quest_handler.complete_quest(char, 'new_quest', quests)
+
+    # Prerequisites edited in place on the quest dict itself
+    quests['orc_menace']['prerequisite_groups'].append(['new_quest'])
+    assert quest_handler.can_accept_quest(char, 'orc_menace', quests)
+
+# ============================================================================
+# QUEST SET TESTS
+# ============================================================================
+
+def test_quest_set_membership_and_save_format():
+    """Test that quest sets keep order and save like plain lists"""
+    char = character_manager.create_character("QuestSetTest", "Cleric")
+    for q_id in ['first_steps', 'goblin_hunter', 'orc_menace']:
+        char['completed_quests'].append(q_id)
+    char['completed_quests'].append('first_steps')
+
+    assert 'goblin_hunter' in char['completed_quests']
+    assert char['completed_quests'] == ['first_steps', 'goblin_hunter', 'orc_menace']
+    assert quest_handler.is_quest_completed(char, 'orc_menace')
+
+    char['active_quests'].append('dragon_slayer')
+    character_manager.save_character(char)
+    with open(os.path.join("data/save_games", "QuestSetTest_save.txt")) as f:
+        saved = f.read()
+    assert "completed_quests:first_steps,goblin_hunter,orc_menace\n" in saved
+
+    loaded = character_manager.load_character("QuestSetTest")
+    assert loaded['completed_quests'] == char['completed_quests']
+    assert loaded['active_quests'] == ['dragon_slayer']
+    character_manager.delete_character("QuestSetTest")
+
+# ============================================================================
+# REWARD TOTAL TESTS
+# ============================================================================
+
+def test_running_reward_totals():
+    """Test that reward totals are kept up to date, saved and rebuilt after reloads"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("TotalsTest", "Rogue")
+    char['level'] = 2
+
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {"total_xp": 0, "total_gold": 0}
+    for q_id in ['first_steps', 'equipment_upgrade']:
+        quest_handler.accept_quest(char, q_id, quests)
+        quest_handler.complete_quest(char, q_id, quests)
+    assert char['quest_xp_earned'] == 125
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {"total_xp": 125, "total_gold": 75}
+
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("TotalsTest")
+    character_manager.delete_character("TotalsTest")
+    assert loaded['quest_xp_earned'] == 125
+
+    # Reloaded catalog with new rewards invalidates the saved totals
+    reloaded = dict(quests)
+    reloaded['first_steps'] = dict(quests['first_steps'], reward_xp=60)
+    quest_handler.build_quest_graph(reloaded)
+    assert quest_handler.get_total_quest_rewards_earned(loaded, reloaded)["total_xp"] == 135
+
+# ============================================================================
+# PREREQUISITE CHAIN TESTS
+# ============================================================================
+
+def test_prerequisite_chains_are_memoized():
+    """Test single and batch chain resolution"""
+    quests = game_data.load_quests("data/quests.txt")
+
+    chain = quest_handler.get_quest_prerequisite_chain('master_adventurer', quests)
+    assert chain == ['first_steps', 'goblin_hunter', 'orc_menace', 'dragon_slayer', 'master_adventurer']
+
+    chains = quest_handler.get_all_prerequisite_chains(quests)
+    assert len(chains) == len(quests)
+    assert chains['treasure_hunter'] == ['first_steps', 'equipment_upgrade', 'treasure_hunter']
+    assert chains.depth('village_champion') == len(chains['village_champion']) == 6
+    assert chains.previous('treasure_hunter') == 'equipment_upgrade'
+
+def test_deep_chains_share_prefixes():
+    """Test that a deep chain stores one link per quest, not one list per quest"""
+    depth = 20000
+    quests = {}
+    for i in range(depth):
+        quests[f'q{i}'] = {'quest_id': f'q{i}', 'required_level': 1,
+                           'prerequisite': f'q{i - 1}' if i else 'NONE'}
+
+    chain = quest_handler.get_quest_prerequisite_chain(f'q{depth - 1}', quests)
+    assert len(chain) == depth and chain[0] == 'q0'
+
+    chains = quest_handler.get_all_prerequisite_chains(quests)
+    assert len(chains) == depth
+    assert chains.depth('q500') == 501
+    assert all(extras == () for _, extras, _ in chains.links.values())
+    assert chains['q3'] == ['q0', 'q1', 'q2', 'q3']
+
+def test_requirement_bits_do_not_grow_with_catalog():
+    """Test that each quest stores bit positions rather than catalog-wide masks"""
+    depth = 20000
+    quests = {}
+    for i in range(depth):
+        quests[f'q{i}'] = {'quest_id': f'q{i}', 'required_level': 1,
+                           'prerequisite': f'q{i - 1}' if i else 'NONE'}
+
+    graph = quest_handler.build_quest_graph(quests)
+    last = f'q{depth - 1}'
+    assert graph.requirement_bits[last] == [(graph.dense_ids[f'q{depth - 2}'],)]
+    assert graph.requirement_bits['q0'] == []
+
+    mask = 1 << graph.dense_ids[f'q{depth - 2}']
+    assert graph.requirements_met(last, mask)
+    assert not graph.requirements_met(last, mask >> 1)
+
+def test_prerequisite_cycle_is_a_data_error():
+    """Test that cyclic prerequisites are reported instead of looping"""
+    from custom_exceptions import DataError
+    quests = {
+        'a': {'quest_id': 'a', 'required_level': 1, 'prerequisite': 'b'},
+        'b': {'quest_id': 'b', 'required_level': 1, 'prerequisite': 'a'},
+        'c': {'quest_id': 'c', 'required_level': 1, 'prerequisite': 'NONE'}
+    }
+    with pytest.raises(DataError):
+        quest_handler.build_quest_graph(quests)
+    with pytest.raises(DataError):
+        quest_handler.get_quest_prerequisite_chain('a', quests)
+
+# ============================================================================
+# GRAPH VALIDATION TESTS
+# ============================================================================
+
+def test_quest_graph_validation_report():
+    """Test cycle, missing, unreachable and level inversion detection"""
+    quests = game_data.load_quests("data/quests.txt")
+    report = quest_handler.validate_quest_prerequisites(quests, report=True)
+    assert report["valid"]
+
+    def quest(q_id, level, prereq):
+        return {'quest_id': q_id, 'required_level': level, 'prerequisite': prereq}
+
+    broken = {
+        'root': quest('root', 1, 'NONE'),
+        'loop_a': quest('loop_a', 2, 'loop_b'),
+        'loop_b': quest('loop_b', 2, 'loop_a | root'),
+        'self_loop': quest('self_loop', 1, 'self_loop'),
+        'behind_loop': quest('behind_loop', 3, 'self_loop'),
+        'orphan': quest('orphan', 1, 'missing'),
+        'too_early': quest('too_early', 1, 'loop_b')
+    }
+    report = quest_handler.validate_quest_graph(broken)
+
+    assert not report["valid"]
+    assert report["missing_prerequisites"] == [('orphan', 'missing')]
+    # loop_a / loop_b can be unlocked through root, so only self_loop blocks
+    assert report["cycles"] == [['self_loop']]
+    assert report["unreachable"] == ['self_loop', 'behind_loop', 'orphan']
+    assert report["level_inversions"] == [('too_early', 'loop_b', 1, 2)]
+
+    # The graph applies the same cycle rule
+    graph = quest_handler.QuestGraph(broken)
+    assert graph.cycles == report["cycles"]
+    assert graph.blocked == {'self_loop', 'behind_loop'}
+    assert graph.topological_order.index('loop_b') < graph.topological_order.index('loop_a')
+    with pytest.raises(InvalidDataFormatError):
+        quest_handler.build_quest_graph(broken)
+
+def test_cycles_do_not_break_unrelated_quests():
+    """Test that quest actions keep working on a catalog with a cycle"""
+    quests = {
+        'a': {'quest_id': 'a', 'required_level': 1, 'prerequisite': 'b',
+              'reward_xp': 10, 'reward_gold': 5},
+        'b': {'quest_id': 'b', 'required_level': 1, 'prerequisite': 'a',
+              'reward_xp': 10, 'reward_gold': 5},
+        'c': {'quest_id': 'c', 'required_level': 1, 'prerequisite': 'NONE',
+              'reward_xp': 10, 'reward_gold': 5}
+    }
+    char = character_manager.create_character("CycleTest", "Warrior")
+    assert quest_handler.can_accept_quest(char, 'c', quests)
+    assert not quest_handler.can_accept_quest(char, 'a', quests)
+    quest_handler.accept_quest(char, 'c', quests)
+    assert quest_handler.complete_quest(char, 'c', quests)["earned_xp"] == 10
+    assert len(quest_handler.get_quests_by_level(quests, 1, 1)) == 3
+    assert quest_handler.get_quest_prerequisite_chain('c', quests) == ['c']
+    with pytest.raises(InvalidDataFormatError):
+        quest_handler.get_quest_prerequisite_chain('a', quests)
+
+# ============================================================================
+# ANALYTICS TESTS
+# ============================================================================
+
+def test_roster_matrix_matches_per_character_checks():
+    """Test bitset availability counts against can_accept_quest"""
+    quests = game_data.load_quests("data/quests.txt")
+    roster = []
+    for level, completed, active in [(1, [], []), (2, ['first_steps'], []),
+                                     (2, ['first_steps'], ['goblin_hunter']),
+                                     (3, ['first_steps', 'goblin_hunter'], []),
+                                     (4, ['first_steps', 'goblin_hunter', 'orc_menace'], [])]:
+        char = character_manager.create_character("RosterTest", "Warrior")
+        char['level'] = level
+        char['completed_quests'] = list(completed)
+        char['active_quests'] = list(active)
+        roster.append(char)
+
+    matrix = quest_analytics.RosterQuestMatrix(roster, quests)
+    for q_id in quests:
+        expected = [i for i, c in enumerate(roster) if quest_handler.can_accept_quest(c, q_id, quests)]
+        assert matrix.characters_available(q_id) == expected
+        assert matrix.count_available(q_id) == len(expected)
+
+    # Lowering goblin_hunter to level 1 adds nobody (prerequisite still needed)
+    assert matrix.level_gate_gain('goblin_hunter', 1) == 0
+    assert matrix.level_gate_gain('orc_menace', 2) == 0
+    assert matrix.best_level_gate_changes(levels_lowered=3) == [('dragon_slayer', 1), ('scouting_party', 1)]
+
+def test_quest_dag_analysis():
+    """Test reward paths, minimum levels, longest chain and unreachable quests"""
+    quests = game_data.load_quests("data/quests.txt")
+
+    total_xp, path = quest_analytics.find_best_reward_path(quests)
+    assert path == quest_handler.get_quest_prerequisite_chain('master_adventurer', quests)
+    assert total_xp == sum(quests[q_id]['reward_xp'] for q_id in path)
+    assert quest_analytics.find_best_reward_path(quests, 'reward_gold')[0] == 1750
+    assert quest_analytics.find_longest_chain(quests) == path
+
+    broken = dict(quests)
+    broken['lost'] = {'quest_id': 'lost', 'required_level': 1, 'prerequisite': 'missing'}
+    broken['after_lost'] = {'quest_id': 'after_lost', 'required_level': 1, 'prerequisite': 'lost'}
+    broken['early'] = {'quest_id': 'early', 'required_level': 1, 'prerequisite': 'orc_menace'}
+    assert quest_analytics.find_unreachable_quests(broken) == {'lost', 'after_lost'}
+
+    levels = quest_analytics.get_minimum_levels(broken)
+    assert levels['early'] == 3
+    assert 'lost' not in levels
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])